@@ -0,0 +1,214 @@
+# app/feedback/aliases.py
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import ALIAS_MIN_MARGIN, ALIAS_MIN_VOTES, TEAM_ALIASES_FILE
+from app.feedback.dataset_builder import extract_final_decision
+from app.inference.exact_join import normalize_team
+
+# Confirmations whose matches are not in the current feeds wait here
+MAX_PENDING = 20000
+
+
+class TeamAliases:
+    """
+    OP team name -> Bet365 team name, per sport, learned from human
+    confirmations in the feedback log.
+
+    Each confirmed mapping ("Mapping Completed", "Team Switched") adds
+    a vote for the two team pairs it implies; "Not Correct" takes one
+    back. The compiled lookup maps (sport, normalized OP name) to the
+    Bet365 name with the most votes, once it has ALIAS_MIN_VOTES and
+    leads the runner-up by ALIAS_MIN_MARGIN; a single mistaken click
+    never becomes an alias. Like DecisionCache, the store remembers
+    how far into the feedback log it has read.
+    """
+
+    def __init__(self, path: str = TEAM_ALIASES_FILE):
+        self.path = Path(path)
+        self.votes = {}
+        self.pending = {}
+        self.feedback_log_id = None
+        self.feedback_offset = 0
+        self.lookup = {}
+        self.mtime = None
+
+        self.load()
+
+    def _stat(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        self.mtime = self._stat()
+
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            self.votes = data.get("votes", {})
+            self.pending = data.get("pending", {})
+            self.feedback_log_id = data.get("feedback_log_id")
+            self.feedback_offset = data.get("feedback_offset", 0)
+
+        self.compile()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "feedback_log_id": self.feedback_log_id,
+                "feedback_offset": self.feedback_offset,
+                "pending": self.pending,
+                "votes": self.votes,
+            }, f)
+
+        os.replace(tmp, self.path)
+        self.mtime = self._stat()
+
+    def refresh(self) -> bool:
+        """
+        Reload if another process (the cron cycle) saved the store
+        since it was last read here.
+        """
+
+        if self._stat() == self.mtime:
+            return False
+
+        self.load()
+        return True
+
+    def compile(self):
+        lookup = {}
+
+        for sport, names in self.votes.items():
+            for op_name, targets in names.items():
+                ranked = sorted(targets.items(), key=lambda kv: kv[1], reverse=True)
+                name, count = ranked[0]
+                runner_up = ranked[1][1] if len(ranked) > 1 else 0
+
+                if count >= ALIAS_MIN_VOTES and count - runner_up >= ALIAS_MIN_MARGIN:
+                    lookup[(sport, op_name)] = name
+
+        self.lookup = lookup
+
+    def __len__(self):
+        return len(self.lookup)
+
+    # --------------------------------------------------
+    # LEARNING
+    # --------------------------------------------------
+
+    def _vote(self, sport: str, op_name: str, b365_name: str, delta: int):
+        key = normalize_team(op_name)
+        if not key or not b365_name or key == normalize_team(b365_name):
+            return
+
+        targets = self.votes.setdefault(sport, {}).setdefault(key, {})
+
+        if delta < 0 and b365_name not in targets:
+            return
+
+        targets[b365_name] = targets.get(b365_name, 0) + delta
+
+    def learn(self, feedback: Dict, op_match: Dict, b365_match: Dict):
+        decision = extract_final_decision(feedback)
+
+        if decision in ("MATCH", "NO_MATCH"):
+            pairs = [("home_team", "home_team"), ("away_team", "away_team")]
+        elif decision == "SWAPPED":
+            pairs = [("home_team", "away_team"), ("away_team", "home_team")]
+        else:
+            return
+
+        delta = -1 if decision == "NO_MATCH" else 1
+        sport = (op_match.get("sport") or "").lower()
+
+        for op_side, b365_side in pairs:
+            self._vote(sport, op_match.get(op_side), b365_match.get(b365_side), delta)
+
+    def apply_feedback(self, log, op_matches: List[Dict], bet365_matches: List[Dict]) -> int:
+        """
+        Learn from feedback logged since the last call. Feedback whose
+        OP or Bet365 match is not in the given lists is kept pending
+        and retried on later calls. Returns how many entries were used.
+        """
+
+        end = log.refresh()
+
+        if self.feedback_log_id is None:
+            # First run learns from the whole history
+            self.feedback_offset = 0
+        elif log.log_id != self.feedback_log_id or end < self.feedback_offset:
+            # Log was compacted; replaying it would count old votes
+            # twice, so reading resumes at its current end
+            self.feedback_offset = end
+
+        for _, row in log.iter_entries(self.feedback_offset, end):
+            if row.get("bet365_match") is not None:
+                self.pending.pop(str(row.get("provider_id")), None)
+                self.pending[str(row.get("provider_id"))] = row
+
+        self.feedback_log_id = log.log_id
+        self.feedback_offset = end
+
+        ops = {str(m.get("id")): m for m in op_matches}
+        b365 = {str(m.get("id")): m for m in bet365_matches}
+
+        learned = 0
+        for provider_id, row in list(self.pending.items()):
+            op_match = ops.get(provider_id)
+            b365_match = b365.get(str(row.get("bet365_match")))
+
+            if op_match is None or b365_match is None:
+                continue
+
+            self.learn(row, op_match, b365_match)
+            del self.pending[provider_id]
+            learned += 1
+
+        # Oldest first, so the overflow drops the stalest confirmations
+        for provider_id in list(self.pending)[:max(0, len(self.pending) - MAX_PENDING)]:
+            del self.pending[provider_id]
+
+        if learned:
+            self.compile()
+
+        return learned
+
+    # --------------------------------------------------
+    # LOOKUP
+    # --------------------------------------------------
+
+    def resolve(self, sport: Optional[str], team: Optional[str]) -> Optional[str]:
+        return self.lookup.get(((sport or "").lower(), normalize_team(team)))
+
+    def rewrite(self, op_match: Dict) -> Dict:
+        """
+        `op_match` with its team names replaced by their Bet365 aliases.
+        The original dict is returned when no alias applies.
+        """
+
+        if not self.lookup:
+            return op_match
+
+        home = self.resolve(op_match.get("sport"), op_match.get("home_team"))
+        away = self.resolve(op_match.get("sport"), op_match.get("away_team"))
+
+        if home is None and away is None:
+            return op_match
+
+        rewritten = dict(op_match)
+        rewritten.pop("text", None)
+        rewritten["home_team"] = home or op_match.get("home_team")
+        rewritten["away_team"] = away or op_match.get("away_team")
+        rewritten["aliased"] = True
+
+        return rewritten
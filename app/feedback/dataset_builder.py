@@ -1,9 +1,29 @@
+import argparse
 import json
+import os
 from pathlib import Path
 
-FEEDBACK_FILE = Path("data/feedback.json")
-MAPPING_FILE = Path("data/mapping_output.json")
-OUTPUT_FILE = Path("data/training_dataset.json")
+from app.feedback.ingestion import get_feedback_log, ingest_feedback_export
+from app.integration.storage import JsonlWriter, data_path, iter_rows
+
+# Both modes read the feedback log, which the feedback export
+# (data/feedback.json) is ingested into first
+
+# Dataset under data/ plus the incremental watermark
+DATASET_FILE = "training_dataset.jsonl"
+STATE_FILE = Path("data/training_dataset.state.json")
+
+# Feedback waiting for its OP match's mapping row; the oldest is
+# dropped beyond this
+MAX_PENDING = 20000
+
+# Short feedback types used by the feedback API
+FEEDBACK_TYPES = {
+    "correct": "MATCH",
+    "need_swap": "SWAPPED",
+    "not_correct": "NO_MATCH",
+    "not_sure": "SKIP",
+}
 
 
 def extract_final_decision(feedback_row):
@@ -13,6 +33,9 @@ def extract_final_decision(feedback_row):
     Not Correct > Not Sure > Mapping Completed > Team Switched
     """
 
+    if feedback_row.get("feedback") in FEEDBACK_TYPES:
+        return FEEDBACK_TYPES[feedback_row["feedback"]]
+
     logs = feedback_row.get("logs", [])
 
     decisions = [log.get("what") for log in logs]
@@ -36,87 +59,222 @@ def extract_final_decision(feedback_row):
     return "SKIP"
 
 
-def build_dataset():
+def build_samples(provider_id, fb, mapping_row):
+    """
+    Training samples from one OP match's feedback and its mapping row.
+    """
 
-    with open(FEEDBACK_FILE, "r", encoding="utf-8") as f:
-        feedback_data = json.load(f)
+    decision = extract_final_decision(fb)
 
-    with open(MAPPING_FILE, "r", encoding="utf-8") as f:
-        mapping_data = json.load(f)
+    if decision == "SKIP":
+        return []
 
-    print(f"Loaded {len(feedback_data)} feedback records")
+    samples = []
+    selected_b365 = fb.get("bet365_match")
+    candidates = mapping_row.get("candidates_top5", [])
 
-    # Build lookup from inference output
-    mapping_lookup = {
-        row["provider_id"]: row
-        for row in mapping_data
-    }
+    # ---- Positive cases ----
+    if decision in ["MATCH", "SWAPPED"]:
 
-    training_samples = []
+        samples.append({
+            "op_id": provider_id,
+            "b365_id": selected_b365,
+            "label": 1,
+            "swapped": decision == "SWAPPED",
+        })
 
-    # Deduplicate by provider_id (keep last)
-    feedback_dedup = {}
-    for row in feedback_data:
-        feedback_dedup[row["provider_id"]] = row
+        # ---- Hard negatives from Top-5 ----
+        # Only if you have Top-5 in mapping_output
+        for c in candidates:
+            if c["bet365_match"] != selected_b365:
+                samples.append({
+                    "op_id": provider_id,
+                    "b365_id": c["bet365_match"],
+                    "label": 0,
+                    "swapped": False,
+                })
 
-    print(f"After deduplication: {len(feedback_dedup)} unique records")
+    # ---- Negative case ----
+    if decision == "NO_MATCH":
 
-    for provider_id, fb in feedback_dedup.items():
+        for c in candidates:
+            samples.append({
+                "op_id": provider_id,
+                "b365_id": c["bet365_match"],
+                "label": 0,
+                "swapped": False,
+            })
 
-        decision = extract_final_decision(fb)
+    return samples
 
-        if decision == "SKIP":
-            continue
 
-        if provider_id not in mapping_lookup:
-            continue
+def _samples_for(feedback, mapping_file):
+    """
+    Samples per OP match for the latest feedback in `feedback`
+    (op id -> row), streaming the mapping output. Returns the samples
+    and the feedback whose OP match has no mapping row yet, oldest
+    first, capped at MAX_PENDING.
+    """
 
-        mapping_row = mapping_lookup[provider_id]
-        selected_b365 = fb.get("bet365_match")
+    updates = {}
 
-        # ---- Positive cases ----
-        if decision in ["MATCH", "SWAPPED"]:
+    # Superseding feedback with SKIP drops the OP match's samples
+    for provider_id, fb in feedback.items():
+        if extract_final_decision(fb) == "SKIP":
+            updates[provider_id] = []
 
-            training_samples.append({
-                "op_id": provider_id,
-                "b365_id": selected_b365,
-                "label": 1,
-                "swapped": decision == "SWAPPED",
-            })
+    for row in iter_rows(mapping_file):
+        provider_id = str(row.get("provider_id"))
+        if provider_id in feedback and provider_id not in updates:
+            updates[provider_id] = build_samples(row["provider_id"], feedback[provider_id], row)
 
-            # ---- Hard negatives from Top-5 ----
-            # Only if you have Top-5 in mapping_output
-            candidates = mapping_row.get("candidates_top5", [])
+    pending = [(k, v) for k, v in feedback.items() if k not in updates]
 
-            for c in candidates:
-                if c["bet365_match"] != selected_b365:
-                    training_samples.append({
-                        "op_id": provider_id,
-                        "b365_id": c["bet365_match"],
-                        "label": 0,
-                        "swapped": False,
-                    })
+    if len(pending) > MAX_PENDING:
+        print(f"Dropped {len(pending) - MAX_PENDING} oldest pending feedback records")
+        pending = pending[-MAX_PENDING:]
 
-        # ---- Negative case ----
-        if decision == "NO_MATCH":
+    return updates, dict(pending)
 
-            candidates = mapping_row.get("candidates_top5", [])
 
-            for c in candidates:
-                training_samples.append({
-                    "op_id": provider_id,
-                    "b365_id": c["bet365_match"],
-                    "label": 0,
-                    "swapped": False,
-                })
+def build_dataset(log=None, mapping_file: str = "mapping_output.json"):
+    """
+    Rebuild the dataset from the latest feedback per OP match and move
+    the incremental watermark to the end of the feedback log.
+    """
+
+    if log is None:
+        log = get_feedback_log()
+    ingest_feedback_export(log=log)
+
+    end = log.refresh()
+    feedback = {str(row["provider_id"]): row for row in log.latest()}
+
+    print(f"Loaded {len(feedback)} unique feedback records")
+
+    updates, pending = _samples_for(feedback, mapping_file)
+
+    tmp = DATASET_FILE + ".tmp"
+
+    with JsonlWriter(tmp, flush_every=1000) as writer:
+        for samples in updates.values():
+            unique = {(str(s["op_id"]), str(s["b365_id"])): s for s in samples}
+            writer.write_many(unique.values())
+
+    os.replace(data_path(tmp), data_path(DATASET_FILE))
+
+    print(f"Generated {writer.count} training samples")
+
+    if pending:
+        print(f"{len(pending)} OP matches have no mapping row yet; kept pending")
+
+    _save_state({"log_id": log.log_id, "offset": end, "pending": pending})
+
+    print(f"✅ Training dataset saved to: {data_path(DATASET_FILE)}")
+
+
+# --------------------------------------------------
+# INCREMENTAL MODE
+# --------------------------------------------------
+
+def _load_state():
+    if not STATE_FILE.exists():
+        return {"log_id": None, "offset": 0, "pending": {}}
+
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(state):
+    tmp = STATE_FILE.with_name(STATE_FILE.name + ".tmp")
+
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+    os.replace(tmp, STATE_FILE)
+
+
+def _merge(updates):
+    """
+    Rewrite the dataset with every sample of the OP matches in
+    `updates` (op id -> samples) replaced, streaming the old rows.
+    Samples are unique by (op_id, b365_id); the last one wins.
+    """
+
+    tmp = DATASET_FILE + ".tmp"
+    kept = 0
+
+    with JsonlWriter(tmp, flush_every=1000) as writer:
+
+        for row in iter_rows(DATASET_FILE, exact=True):
+            if str(row["op_id"]) not in updates:
+                writer.write(row)
+                kept += 1
+
+        for samples in updates.values():
+            unique = {(str(s["op_id"]), str(s["b365_id"])): s for s in samples}
+            writer.write_many(unique.values())
+
+    os.replace(data_path(tmp), data_path(DATASET_FILE))
+
+    return kept, writer.count - kept
+
+
+def build_dataset_incremental(log=None, mapping_file: str = "mapping_output.json"):
+    """
+    Fold feedback logged since the last run into the on-disk dataset.
+
+    The watermark is the feedback log offset reached last time. Only
+    mapping rows of OP matches with new feedback are kept while the
+    mapping output is streamed. Feedback whose OP match is not in the
+    mapping output yet stays pending for the next run.
+    """
+
+    if log is None:
+        log = get_feedback_log()
+    ingest_feedback_export(log=log)
+
+    state = _load_state()
+
+    end = log.refresh()
+    offset = state["offset"]
+
+    if state["log_id"] != log.log_id or end < offset:
+        # First run, or the log was compacted; replaying it is safe
+        # since each OP match's samples are replaced, not appended
+        if state["log_id"] is not None:
+            print("Feedback log was compacted; replaying it from the start.")
+        offset = 0
+
+    # Latest new feedback per OP match
+    feedback = dict(state["pending"])
+    for _, row in log.iter_entries(offset, end):
+        # Newer feedback moves to the back of the pending order
+        feedback.pop(str(row["provider_id"]), None)
+        feedback[str(row["provider_id"])] = row
+
+    print(f"New feedback records: {len(feedback) - len(state['pending'])} (+{len(state['pending'])} pending)")
+
+    updates, pending = _samples_for(feedback, mapping_file)
+
+    if updates:
+        kept, added = _merge(updates)
+        print(f"Updated {len(updates)} OP matches: {added} new samples, {kept} kept")
 
-    print(f"Generated {len(training_samples)} training samples")
+    if pending:
+        print(f"{len(pending)} OP matches have no mapping row yet; kept pending")
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(training_samples, f, indent=2)
+    _save_state({"log_id": log.log_id, "offset": end, "pending": pending})
 
-    print(f"✅ Training dataset saved to: {OUTPUT_FILE}")
+    print(f"✅ Training dataset saved to: {data_path(DATASET_FILE)}")
 
 
 if __name__ == "__main__":
-    build_dataset()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true", help="only fold in feedback logged since the last run")
+    args = parser.parse_args()
+
+    if args.incremental:
+        build_dataset_incremental()
+    else:
+        build_dataset()
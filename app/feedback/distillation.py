@@ -0,0 +1,200 @@
+# app/feedback/distillation.py
+
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config import CROSS_ENCODER_MODEL_NAME, RERANK_BATCH_SIZE, STUDENT_LAYERS, STUDENT_MODEL_DIR
+from app.feedback.dataset_builder import DATASET_FILE
+from app.inference.engine import retrieve_batch
+from app.inference.gates import apply_gates
+from app.inference.reranker import Reranker
+from app.inference.text_builder import build_text
+from app.integration.storage import iter_rows
+
+Pair = Tuple[str, str]
+
+
+# --------------------------------------------------
+# TRAINING PAIRS
+# --------------------------------------------------
+
+def collect_pairs(op_matches: List[Dict], bet365: List[Dict], retrieved=None) -> List[Pair]:
+    """
+    Distillation inputs: every (OP text, Bet365 text) pair the reranker
+    scores in a mapping run over these matches, plus every labeled pair
+    of the training dataset (including mined negatives). Deduplicated.
+    """
+
+    if retrieved is None:
+        retrieved = retrieve_batch(op_matches, bet365)
+
+    pairs = {}
+
+    for _, op_text, candidates in retrieved:
+        for c in candidates:
+            pairs[(op_text, c["text"])] = None
+
+    op_texts = {str(m.get("id")): build_text(m) for m in op_matches}
+    b365_texts = {str(m.get("id")): build_text(m) for m in bet365}
+
+    for row in iter_rows(DATASET_FILE, exact=True):
+        a = op_texts.get(str(row.get("op_id")))
+        b = b365_texts.get(str(row.get("b365_id")))
+        if a and b:
+            pairs[(a, b)] = None
+
+    return list(pairs)
+
+
+def teacher_logits(pairs: Sequence[Pair], teacher: str = CROSS_ENCODER_MODEL_NAME, batch_size: int = RERANK_BATCH_SIZE):
+    """
+    Raw teacher logits. The student is trained on logits, so after the
+    same default activation its scores land on the teacher's scale.
+    """
+
+    import torch
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(teacher)
+    return model.predict(list(pairs), batch_size=batch_size, activation_fct=torch.nn.Identity())
+
+
+# --------------------------------------------------
+# STUDENT
+# --------------------------------------------------
+
+def make_student(teacher: str = CROSS_ENCODER_MODEL_NAME, layers: Sequence[int] = STUDENT_LAYERS, out_dir: str = STUDENT_MODEL_DIR):
+    """
+    Student initialised from the teacher with only `layers` of its
+    encoder kept; embeddings and classifier head are copied as is.
+    """
+
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    model = AutoModelForSequenceClassification.from_pretrained(teacher)
+    encoder = model.base_model.encoder
+
+    encoder.layer = torch.nn.ModuleList([encoder.layer[i] for i in layers])
+    model.config.num_hidden_layers = len(layers)
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    model.save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(teacher).save_pretrained(out_dir)
+
+    return out_dir
+
+
+def distill(
+    pairs: Sequence[Pair],
+    logits: Sequence[float],
+    out_dir: str = STUDENT_MODEL_DIR,
+    epochs: int = 3,
+    batch_size: int = 32,
+):
+    """
+    Fit the student in `out_dir` to the teacher logits (MSE) and save it
+    there, loadable as Reranker(model_name=out_dir).
+    """
+
+    import torch
+    from sentence_transformers import CrossEncoder, InputExample
+    from torch.utils.data import DataLoader
+
+    student = CrossEncoder(out_dir, num_labels=1)
+
+    examples = [InputExample(texts=[a, b], label=float(y)) for (a, b), y in zip(pairs, logits)]
+    loader = DataLoader(examples, shuffle=True, batch_size=batch_size)
+
+    student.fit(
+        train_dataloader=loader,
+        loss_fct=torch.nn.MSELoss(),
+        epochs=epochs,
+        warmup_steps=int(0.1 * len(loader) * epochs),
+        show_progress_bar=True,
+    )
+
+    student.save(out_dir)
+    return student
+
+
+# --------------------------------------------------
+# EVALUATION
+# --------------------------------------------------
+
+def _timed_rerank(reranker: Reranker, jobs, batch_size: int):
+    # Fresh copies: rerank_many writes final_score into the dicts
+    jobs = [(op_text, [dict(c) for c in candidates]) for op_text, candidates in jobs]
+    n_pairs = sum(len(candidates) for _, candidates in jobs)
+
+    start = time.perf_counter()
+    reranked = reranker.rerank_many(jobs, batch_size=batch_size)
+    seconds = time.perf_counter() - start
+
+    return reranked, {
+        "seconds": round(seconds, 3),
+        "pairs": n_pairs,
+        "pairs_per_sec": round(n_pairs / seconds, 1) if seconds else None,
+        "ms_per_op": round(1000 * seconds / max(len(jobs), 1), 3),
+    }
+
+
+def evaluate(
+    retrieved,
+    teacher: str = CROSS_ENCODER_MODEL_NAME,
+    student: str = STUDENT_MODEL_DIR,
+    batch_size: int = RERANK_BATCH_SIZE,
+) -> Dict:
+    """
+    Rerank the same retrieved candidates with teacher and student
+    (no pair cache) and compare latency, gate decisions and top-1.
+    """
+
+    jobs = [(op_text, candidates) for _, op_text, candidates in retrieved]
+
+    teacher_reranked, teacher_latency = _timed_rerank(Reranker(teacher, use_cache=False), jobs, batch_size)
+    student_reranked, student_latency = _timed_rerank(Reranker(student, use_cache=False), jobs, batch_size)
+
+    changes = {}
+    top1_changed = 0
+    teacher_scores = []
+    student_scores = []
+
+    for t, s in zip(teacher_reranked, student_reranked):
+        t_decision, s_decision = apply_gates(t), apply_gates(s)
+        if t_decision != s_decision:
+            key = f"{t_decision} -> {s_decision}"
+            changes[key] = changes.get(key, 0) + 1
+
+        if t and s and t[0]["id"] != s[0]["id"]:
+            top1_changed += 1
+
+        by_id = {c["id"]: c["final_score"] for c in s}
+        for c in t:
+            if c["id"] in by_id:
+                teacher_scores.append(c["final_score"])
+                student_scores.append(by_id[c["id"]])
+
+    n = len(jobs)
+    changed = sum(changes.values())
+
+    return {
+        "teacher": teacher,
+        "student": student,
+        "op_matches": n,
+        "latency": {
+            "teacher": teacher_latency,
+            "student": student_latency,
+            "speedup": round(teacher_latency["seconds"] / student_latency["seconds"], 2)
+            if student_latency["seconds"] else None,
+        },
+        "gate_decisions_changed": changed,
+        "gate_decisions_changed_pct": round(100 * changed / n, 2) if n else 0.0,
+        "gate_changes": changes,
+        "top1_changed": top1_changed,
+        "score_correlation": round(float(np.corrcoef(teacher_scores, student_scores)[0, 1]), 4)
+        if len(teacher_scores) > 1 else None,
+    }
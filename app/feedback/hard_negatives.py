@@ -0,0 +1,126 @@
+# app/feedback/hard_negatives.py
+
+import os
+from typing import Dict, List, Set
+
+import numpy as np
+import torch
+
+from config import HARD_NEGATIVES_K
+from app.feedback.dataset_builder import DATASET_FILE
+from app.inference.registry import registry
+from app.inference.text_builder import build_text
+from app.integration.storage import JsonlWriter, data_path, iter_rows
+
+MINED = "mined"
+
+
+def labeled_positives(dataset_file: str = DATASET_FILE) -> Dict[str, Set[str]]:
+    """
+    op_id -> Bet365 ids labeled as its match in the training dataset.
+    """
+
+    positives = {}
+    for row in iter_rows(dataset_file, exact=True):
+        if row.get("label") == 1:
+            positives.setdefault(str(row["op_id"]), set()).add(str(row["b365_id"]))
+    return positives
+
+
+def mine_hard_negatives(
+    op_matches: List[Dict],
+    positives: Dict[str, Set[str]],
+    bet365: List[Dict],
+    k: int = HARD_NEGATIVES_K,
+    batch_size: int = 256,
+) -> Dict[str, List[Dict]]:
+    """
+    The k Bet365 matches of the same sport closest to each labeled OP
+    match, excluding its labeled matches.
+
+    Bet365 embeddings come from the SBERT corpus index (and through it
+    the on-disk embedding store), so a nightly run only encodes texts
+    it has not seen before. Each batch of OP matches is one masked
+    matrix query against the whole corpus.
+    """
+
+    labeled = [m for m in op_matches if str(m.get("id")) in positives]
+    if not labeled or not bet365:
+        return {}
+
+    sbert = registry.sbert()
+    if not sbert.has_corpus(bet365):
+        sbert.build_corpus(bet365)
+
+    corpus_sports = np.array([m.get("sport") for m in bet365])
+    sport_masks = {}
+
+    mined = {}
+
+    for start in range(0, len(labeled), batch_size):
+        batch = labeled[start:start + batch_size]
+
+        for m in batch:
+            if m.get("sport") not in sport_masks:
+                sport_masks[m.get("sport")] = corpus_sports == m.get("sport")
+
+        mask = torch.from_numpy(np.stack([sport_masks[m.get("sport")] for m in batch]))
+
+        # Over-fetch so dropping the labeled matches still leaves k
+        top_k = k + max(len(positives[str(m["id"])]) for m in batch)
+        hits = sbert.search_corpus_batch([build_text(m) for m in batch], mask, top_k=top_k)
+
+        for op, row_hits in zip(batch, hits):
+            op_id = str(op["id"])
+            negatives = [
+                (row, score)
+                for row, score in row_hits
+                if str(bet365[row].get("id")) not in positives[op_id]
+            ][:k]
+
+            mined[op_id] = [
+                {
+                    "op_id": op["id"],
+                    "b365_id": bet365[row].get("id"),
+                    "label": 0,
+                    "swapped": False,
+                    "source": MINED,
+                    "sbert_score": round(score, 4),
+                }
+                for row, score in negatives
+            ]
+
+    return mined
+
+
+def write_hard_negatives(mined: Dict[str, List[Dict]], dataset_file: str = DATASET_FILE):
+    """
+    Merge mined negatives into the dataset in one streaming pass.
+    Negatives mined earlier for the same OP matches are replaced;
+    pairs that already carry a label from feedback are left alone.
+    """
+
+    tmp = dataset_file + ".tmp"
+    labeled = set()
+    kept = 0
+
+    with JsonlWriter(tmp, flush_every=1000) as writer:
+
+        for row in iter_rows(dataset_file, exact=True):
+            if row.get("source") == MINED and str(row["op_id"]) in mined:
+                continue
+
+            writer.write(row)
+            labeled.add((str(row["op_id"]), str(row["b365_id"])))
+            kept += 1
+
+        for samples in mined.values():
+            for s in samples:
+                key = (str(s["op_id"]), str(s["b365_id"]))
+                if key not in labeled:
+                    writer.write(s)
+                    labeled.add(key)
+
+    os.replace(data_path(tmp), data_path(dataset_file))
+
+    return kept, writer.count - kept
@@ -1,38 +1,471 @@
 # app/feedback/ingestion.py
 
+import atexit
 import json
+import os
+import threading
+import time
+import uuid
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from config import (
+    FEEDBACK_COMPACT_MIN_ENTRIES,
+    FEEDBACK_COMPACT_RATIO,
+    FEEDBACK_FSYNC_EVERY,
+    FEEDBACK_FSYNC_INTERVAL_SEC,
+    FEEDBACK_LOG_FILE,
+)
+from app.integration.storage import dumps_line, loads_line
 
-FEEDBACK_FILE = Path("data/feedback_log.json")
+
+FEEDBACK_FILE = Path(FEEDBACK_LOG_FILE)
+
+# Pre-JSONL log; migrated into FEEDBACK_FILE on first open
+LEGACY_FEEDBACK_FILE = Path("data/feedback_log.json")
+
+# Feedback export from the mapping API (a JSON list, one row per review)
+FEEDBACK_EXPORT_FILE = Path("data/feedback.json")
+
+
+class _FileLock:
+    """
+    Blocking exclusive lock on a side file, shared by every process
+    writing the same log.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, "a+")
+
+        if os.name == "nt":
+            import msvcrt
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+
+        return self
+
+    def __exit__(self, *exc):
+        if os.name == "nt":
+            import msvcrt
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+
+        self.handle.close()
+        self.handle = None
+
+
+class FeedbackLog:
+    """
+    Append-only, line-delimited feedback log.
+
+    Each entry is one JSON line. Appends are flushed immediately and
+    fsynced in batches (every `fsync_every` entries or `fsync_interval`
+    seconds). An in-memory provider_id -> offset index of each
+    provider's latest entry serves random lookups; it is persisted next
+    to the log so opening only scans lines appended since.
+
+    Compaction rewrites the log keeping only the latest entry per
+    provider and gives the log a new `log_id`, so readers tracking
+    offsets know to start over.
+    """
+
+    def __init__(
+        self,
+        path: Path = FEEDBACK_FILE,
+        fsync_every: int = FEEDBACK_FSYNC_EVERY,
+        fsync_interval: float = FEEDBACK_FSYNC_INTERVAL_SEC,
+    ):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self.lock = threading.RLock()
+        self.file_lock = _FileLock(self.path.with_name(self.path.name + ".lock"))
+        self.compaction = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self.file_lock:
+            self._migrate_legacy()
+            self.path.touch()
+            self._repair_tail()
+
+        self._open()
+        self._load_index()
+        self.refresh()
+
+    # --------------------------------------------------
+    # FILES AND INDEX
+    # --------------------------------------------------
+
+    def _migrate_legacy(self):
+        if self.path.exists() or self.path != FEEDBACK_FILE or not LEGACY_FEEDBACK_FILE.exists():
+            return
+
+        with open(LEGACY_FEEDBACK_FILE, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            for entry in entries:
+                f.write(dumps_line(entry))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, self.path)
+        print(f"Migrated {len(entries)} feedback entries to {self.path}")
+
+    def _repair_tail(self):
+        # A crash mid-append can leave a partial last line
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            end = size
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                cut = f.read(end - start).rfind(b"\n")
+                if cut >= 0:
+                    end = start + cut + 1
+                    break
+                end = start
+
+            f.truncate(end)
+
+    def _open(self):
+        self.writer = open(self.path, "ab")
+        self.reader = open(self.path, "rb")
+        self.inode = os.fstat(self.writer.fileno()).st_ino
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _close_files(self):
+        self.sync()
+        self.writer.close()
+        self.reader.close()
+
+    def _reset_index(self):
+        self.log_id = uuid.uuid4().hex
+        self.size = 0
+        self.entries = 0
+        self.offsets = {}
+
+    def _load_index(self):
+        self._reset_index()
+
+        if not self.index_path.exists():
+            return
+
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get("inode") != self.inode or data.get("size", 0) > os.path.getsize(self.path):
+            return
+
+        self.log_id = data["log_id"]
+        self.size = data["size"]
+        self.entries = data["entries"]
+        self.offsets = data["offsets"]
+
+    def _save_index(self):
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "log_id": self.log_id,
+                "inode": self.inode,
+                "size": self.size,
+                "entries": self.entries,
+                "offsets": self.offsets,
+            }, f)
+
+        os.replace(tmp, self.index_path)
+
+    def refresh(self) -> int:
+        """
+        Index lines appended since the last call, by this or any other
+        process, and reopen the log if it was compacted elsewhere.
+        Returns the indexed size in bytes.
+        """
+
+        with self.lock:
+            if os.stat(self.path).st_ino != self.inode:
+                self._close_files()
+                self._open()
+                self._reset_index()
+
+            for offset, entry in self._scan(self.size):
+                self.offsets[str(entry.get("provider_id"))] = offset
+                self.entries += 1
+                self.size = offset + entry.pop("_length")
+
+            return self.size
+
+    def _scan(self, start: int, end: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+
+            for line in f:
+                if end is not None and offset >= end:
+                    return
+                if not line.endswith(b"\n"):
+                    # Another writer is mid-append
+                    return
+
+                if line.strip():
+                    entry = loads_line(line)
+                    entry["_length"] = len(line)
+                    yield offset, entry
+
+                offset += len(line)
+
+    # --------------------------------------------------
+    # WRITE
+    # --------------------------------------------------
+
+    def append(self, feedback: Dict) -> int:
+        """
+        Append one entry; returns its offset.
+        """
+
+        line = dumps_line(feedback)
+
+        with self.lock, self.file_lock:
+            self.refresh()
+
+            offset = self.size
+            self.writer.write(line)
+            self.writer.flush()
+
+            self.offsets[str(feedback.get("provider_id"))] = offset
+            self.entries += 1
+            self.size = offset + len(line)
+
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self.sync()
+
+        self.maybe_compact()
+        return offset
+
+    def sync(self):
+        with self.lock:
+            if self.unsynced:
+                os.fsync(self.writer.fileno())
+                self.unsynced = 0
+            self.last_sync = time.monotonic()
+
+    def close(self):
+        if self.compaction is not None:
+            self.compaction.join()
+
+        with self.lock:
+            self._close_files()
+            self._save_index()
+
+    # --------------------------------------------------
+    # READ
+    # --------------------------------------------------
+
+    def get(self, provider_id) -> Optional[Dict]:
+        """
+        Latest entry for one provider.
+        """
+
+        with self.lock:
+            self.refresh()
+
+            offset = self.offsets.get(str(provider_id))
+            if offset is None:
+                return None
+
+            self.reader.seek(offset)
+            return loads_line(self.reader.readline())
+
+    def iter_entries(self, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, Dict]]:
+        """
+        (offset, entry) for every line from byte `start` up to `end`
+        (default: everything indexed now), in append order.
+        """
+
+        if end is None:
+            end = self.refresh()
+
+        for offset, entry in self._scan(start, end):
+            entry.pop("_length")
+            yield offset, entry
+
+    def latest(self) -> Iterator[Dict]:
+        """
+        Latest entry per provider, in log order.
+        """
+
+        with self.lock:
+            self.refresh()
+            wanted = set(self.offsets.values())
+            end = self.size
+
+        for offset, entry in self.iter_entries(0, end):
+            if offset in wanted:
+                yield entry
+
+    def __len__(self) -> int:
+        return self.entries
+
+    # --------------------------------------------------
+    # COMPACTION
+    # --------------------------------------------------
+
+    def compact(self) -> int:
+        """
+        Rewrite the log with only the latest entry per provider.
+        Appends keep working while the snapshot is copied; only the
+        final swap holds the lock. Returns the number of lines dropped.
+        """
+
+        with self.lock:
+            self.sync()
+            self.refresh()
+            snapshot_end = self.size
+            wanted = set(self.offsets.values())
+            inode = self.inode
+            # Keeps this version readable even if it gets replaced
+            source = open(self.path, "rb")
+
+        tmp = self.path.with_name(self.path.name + ".compact")
+
+        with source, open(tmp, "wb") as out:
+            offset = 0
+            for line in source:
+                if offset >= snapshot_end:
+                    break
+                if offset in wanted:
+                    out.write(line)
+                offset += len(line)
+
+        with self.lock, self.file_lock:
+            if os.stat(self.path).st_ino != inode:
+                # Compacted by another process meanwhile
+                tmp.unlink()
+                return 0
+
+            self.refresh()
+            before = self.entries
+
+            # Lines appended during the copy go over as they are
+            with open(self.path, "rb") as f, open(tmp, "ab") as out:
+                f.seek(snapshot_end)
+                out.write(f.read(self.size - snapshot_end))
+                out.flush()
+                os.fsync(out.fileno())
+
+            self._close_files()
+            os.replace(tmp, self.path)
+
+            self._open()
+            self._reset_index()
+            self.refresh()
+            self._save_index()
+
+            return before - self.entries
+
+    def maybe_compact(self) -> bool:
+        """
+        Start a background compaction once stale lines dominate.
+        """
+
+        with self.lock:
+            if self.compaction is not None and self.compaction.is_alive():
+                return False
+            if self.entries < FEEDBACK_COMPACT_MIN_ENTRIES:
+                return False
+            if self.entries < FEEDBACK_COMPACT_RATIO * max(len(self.offsets), 1):
+                return False
+
+            self.compaction = threading.Thread(target=self.compact, daemon=True)
+            self.compaction.start()
+            return True
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_feedback_log() -> FeedbackLog:
+    global _log
+
+    with _log_lock:
+        if _log is None:
+            _log = FeedbackLog()
+            atexit.register(_log.close)
+        return _log
 
 
 def save_feedback(feedback: Dict):
     """
-    Save one feedback entry to feedback_log.json
+    Append one feedback entry to the feedback log
+    """
+    get_feedback_log().append(feedback)
+
+
+def ingest_feedback_export(path: Path = FEEDBACK_EXPORT_FILE, log: Optional[FeedbackLog] = None) -> int:
+    """
+    Append every row of the feedback export that is new or differs
+    from its provider's latest logged entry, so readers of the log
+    (decision cache, aliases, dataset builder) see the real feedback.
+    Returns the number of entries appended.
     """
 
-    FEEDBACK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    path = Path(path)
+    if not path.exists():
+        return 0
 
-    if FEEDBACK_FILE.exists():
-        with open(FEEDBACK_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = []
+    with open(path, "r", encoding="utf-8") as f:
+        rows = json.load(f)
 
-    data.append(feedback)
+    # The export can hold several rows per provider; the last one wins
+    latest = {}
+    for row in rows:
+        latest.pop(str(row.get("provider_id")), None)
+        latest[str(row.get("provider_id"))] = row
 
-    with open(FEEDBACK_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    if log is None:
+        log = get_feedback_log()
+    appended = 0
+
+    for provider_id, row in latest.items():
+        # Compared as they would read back from the log
+        if log.get(provider_id) != loads_line(dumps_line(row)):
+            log.append(row)
+            appended += 1
+
+    log.sync()
+    return appended
 
 
 def load_feedback() -> List[Dict]:
     """
     Load all feedback entries
     """
-    if not FEEDBACK_FILE.exists():
-        return []
-
-    with open(FEEDBACK_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return [entry for _, entry in get_feedback_log().iter_entries()]
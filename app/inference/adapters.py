@@ -3,23 +3,34 @@
 from app.inference.time_utils import unix_to_iso
 
 
+def _kickoff(raw: dict):
+    # A missing kickoff is kept as None; such matches only go through
+    # the engine's global (ANN) retrieval
+    ts = raw.get("commence_time")
+    return unix_to_iso(ts), ts
+
+
 def adapt_bet365_match(raw: dict) -> dict:
+    kickoff_utc, commence_time = _kickoff(raw)
     return {
         "id": raw.get("id"),
-        "sport": raw.get("sport", "").lower(),
-        "league": raw.get("league", {}).get("name", ""),
+        "sport": (raw.get("sport") or "").lower(),
+        "league": (raw.get("league") or {}).get("name", ""),
         "home_team": raw.get("home_team"),
         "away_team": raw.get("away_team"),
-        "kickoff_utc": unix_to_iso(raw["commence_time"]),
+        "kickoff_utc": kickoff_utc,
+        "commence_time": commence_time,
     }
 
 
 def adapt_oddsportal_match(raw: dict) -> dict:
+    kickoff_utc, commence_time = _kickoff(raw)
     return {
         "id": raw.get("id"),
-        "sport": raw.get("sport", "").lower(),
-        "league": raw.get("league", {}).get("league_name_en", ""),
+        "sport": (raw.get("sport") or "").lower(),
+        "league": (raw.get("league") or {}).get("league_name_en", ""),
         "home_team": raw.get("home_team"),
         "away_team": raw.get("away_team"),
-        "kickoff_utc": unix_to_iso(raw["commence_time"]),
+        "kickoff_utc": kickoff_utc,
+        "commence_time": commence_time,
     }
@@ -0,0 +1,234 @@
+# app/inference/ann_index.py
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from config import ANN_NPROBE
+
+# Below this many vectors a single list (an exact scan) is cheaper
+# than clustering, e.g. for request-sized pools
+MIN_CLUSTER_SIZE = 1024
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over normalized vectors, in NumPy.
+
+    Vectors are clustered with spherical k-means into ~sqrt(N) lists;
+    a query scores the centroids, then only the vectors of its
+    `nprobe` closest lists. Ids can be added and removed at any time;
+    the lists are re-clustered once the index has grown to four times
+    the size it was trained on.
+    """
+
+    def __init__(self, dim: int, nprobe: int = ANN_NPROBE, seed: int = 0):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.rng = np.random.default_rng(seed)
+
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.trained_size = 0
+
+        # Slot storage: a vector keeps its slot until removed
+        self._buffer = np.zeros((0, dim), dtype=np.float32)
+        self.size = 0
+        self.slot_ids = []
+        self.id_slot = {}
+
+        self.lists = []
+        self.slot_list = []
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.id_slot)
+
+    # --------------------------------------------------
+    # TRAINING
+    # --------------------------------------------------
+
+    def _kmeans(self, vectors: np.ndarray, n_lists: int, iterations: int = 10) -> np.ndarray:
+        sample = vectors
+        if len(sample) > 256 * n_lists:
+            sample = sample[self.rng.choice(len(sample), 256 * n_lists, replace=False)]
+
+        centroids = sample[self.rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=n_lists)
+
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[self.rng.choice(len(sample), int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        return centroids.astype(np.float32)
+
+    def _train(self):
+        # Removed slots are dropped here, so churn does not grow the buffer
+        live = [s for s in range(self.size) if self.slot_ids[s] is not None]
+        vectors = self._buffer[live]
+
+        self._buffer = np.array(vectors)
+        self.size = len(live)
+        self.slot_ids = [self.slot_ids[s] for s in live]
+        self.id_slot = {id_: slot for slot, id_ in enumerate(self.slot_ids)}
+
+        n_lists = max(1, int(np.sqrt(self.size))) if self.size >= MIN_CLUSTER_SIZE else 1
+        self.centroids = self._kmeans(vectors, n_lists) if n_lists > 1 else np.zeros((1, self.dim), dtype=np.float32)
+        self.trained_size = self.size
+
+        self.lists = [[] for _ in range(len(self.centroids))]
+        self.slot_list = [-1] * self.size
+        self._arrays = {}
+
+        for slot, lst in enumerate(self._assign(vectors)):
+            self.lists[lst].append(slot)
+            self.slot_list[slot] = lst
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if len(self.centroids) == 1:
+            return np.zeros(len(vectors), dtype=np.int64)
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    # --------------------------------------------------
+    # ADD / REMOVE
+    # --------------------------------------------------
+
+    def add(self, ids: Iterable, vectors: np.ndarray):
+        """
+        Add (or replace) vectors under the given ids.
+        """
+
+        ids = list(ids)
+        if not ids:
+            return
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+
+        self.remove([i for i in ids if i in self.id_slot])
+
+        needed = self.size + len(ids)
+        if needed > len(self._buffer):
+            # Doubling buffer, as in SBERTIndex.extend_corpus
+            buffer = np.zeros((max(needed, 2 * len(self._buffer), 1024), self.dim), dtype=np.float32)
+            buffer[:self.size] = self._buffer[:self.size]
+            self._buffer = buffer
+
+        start = self.size
+        self._buffer[start:needed] = vectors
+        self.size = needed
+
+        for slot, id_ in enumerate(ids, start=start):
+            self.slot_ids.append(id_)
+            self.id_slot[id_] = slot
+
+        if not self.trained_size or len(self) > 4 * max(self.trained_size, 64):
+            self._train()
+            return
+
+        self.slot_list.extend([-1] * len(ids))
+        for slot, lst in zip(range(start, needed), self._assign(vectors)):
+            self.lists[lst].append(slot)
+            self.slot_list[slot] = lst
+            self._arrays.pop(lst, None)
+
+    def remove(self, ids: Iterable):
+        for id_ in ids:
+            slot = self.id_slot.pop(id_, None)
+            if slot is None:
+                continue
+
+            lst = self.slot_list[slot]
+            self.lists[lst].remove(slot)
+            self._arrays.pop(lst, None)
+
+            self.slot_ids[slot] = None
+            self.slot_list[slot] = -1
+
+    # --------------------------------------------------
+    # SEARCH
+    # --------------------------------------------------
+
+    def _list_array(self, lst: int) -> np.ndarray:
+        array = self._arrays.get(lst)
+        if array is None:
+            array = np.asarray(self.lists[lst], dtype=np.int64)
+            self._arrays[lst] = array
+        return array
+
+    def search(self, queries: np.ndarray, k: int, nprobe: int = None) -> List[List[Tuple[object, float]]]:
+        """
+        Approximate top-k (id, cosine) per query, best first.
+        """
+
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+
+        if not len(self):
+            return [[] for _ in queries]
+
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = queries @ self.centroids.T
+
+        results = []
+        for q, scores in zip(queries, centroid_scores):
+            probe = np.argpartition(-scores, nprobe - 1)[:nprobe] if nprobe < len(scores) else range(len(scores))
+            slots = np.concatenate([self._list_array(lst) for lst in probe])
+
+            if not len(slots):
+                results.append([])
+                continue
+
+            sims = self._buffer[slots] @ q
+            top = np.argpartition(-sims, k - 1)[:k] if k < len(sims) else np.arange(len(sims))
+            top = top[np.argsort(-sims[top])]
+
+            results.append([(self.slot_ids[slots[i]], float(sims[i])) for i in top])
+
+        return results
+
+
+class GlobalIndex:
+    """
+    One IVFIndex per sport over pool rows, so a global lookup only
+    ever sees fixtures of the OP match's sport.
+    """
+
+    def __init__(self, dim: int, nprobe: int = ANN_NPROBE):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.by_sport: Dict[str, IVFIndex] = {}
+        self.row_sport = {}
+
+    def add(self, rows: List[int], vectors: np.ndarray, sports: List[str]):
+        grouped = defaultdict(list)
+        for i, (row, sport) in enumerate(zip(rows, sports)):
+            grouped[(sport or "").lower()].append(i)
+
+        for sport, positions in grouped.items():
+            index = self.by_sport.get(sport)
+            if index is None:
+                index = self.by_sport[sport] = IVFIndex(self.dim, self.nprobe)
+
+            index.add([rows[i] for i in positions], vectors[positions])
+            for i in positions:
+                self.row_sport[rows[i]] = sport
+
+    def remove(self, rows: Iterable[int]):
+        for row in rows:
+            sport = self.row_sport.pop(row, None)
+            if sport is not None:
+                self.by_sport[sport].remove([row])
+
+    def search(self, sport: str, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        index = self.by_sport.get((sport or "").lower())
+        if index is None:
+            return [[] for _ in range(len(queries))]
+        return index.search(queries, k)
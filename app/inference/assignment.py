@@ -0,0 +1,193 @@
+# app/inference/assignment.py
+
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import ASSIGN_MAX_BLOCK
+
+
+def _prob(candidate: Dict) -> float:
+    return 1 / (1 + math.exp(-float(candidate.get("final_score", 0.0))))
+
+
+def _components(candidate_lists: Sequence[Optional[List[Dict]]]) -> List[List[int]]:
+    """
+    OP indices grouped by connected component of the bipartite graph
+    OP -> candidate Bet365 ids (union-find on shared ids).
+    """
+
+    parent = list(range(len(candidate_lists)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner = {}
+    for i, candidates in enumerate(candidate_lists):
+        for c in candidates or ():
+            j = owner.setdefault(c.get("id"), i)
+            a, b = find(i), find(j)
+            if a != b:
+                parent[a] = b
+
+    groups = defaultdict(list)
+    for i, candidates in enumerate(candidate_lists):
+        if candidates:
+            groups[find(i)].append(i)
+
+    return list(groups.values())
+
+
+def min_cost_assignment(edges: List[List[Tuple[int, float]]], n_cols: int) -> List[int]:
+    """
+    Min-cost assignment on a sparse cost matrix: edges[r] holds
+    (column, cost >= 0) for row r, and every row must have at least one
+    column no other row can take (callers add a private "unassigned"
+    column). Successive shortest paths with Dijkstra on reduced costs,
+    so each augmentation only touches the edges it reaches.
+    Returns the column assigned to each row.
+    """
+
+    n_rows = len(edges)
+    pot_row = [0.0] * n_rows
+    pot_col = [0.0] * n_cols
+    row_col = [-1] * n_rows
+    col_row = [-1] * n_cols
+
+    for root in range(n_rows):
+        dist_row = {root: 0.0}
+        dist_col = {}
+        prev = {}
+        done_row, done_col = set(), set()
+        heap = [(0.0, 0, root)]
+        target, reach = None, 0.0
+
+        while heap:
+            d, is_col, x = heapq.heappop(heap)
+
+            if is_col:
+                if x in done_col:
+                    continue
+                done_col.add(x)
+
+                if col_row[x] == -1:
+                    target, reach = x, d
+                    break
+
+                # Matched edges are tight: reduced cost 0 back to the row
+                r = col_row[x]
+                if r not in done_row and d < dist_row.get(r, math.inf):
+                    dist_row[r] = d
+                    heapq.heappush(heap, (d, 0, r))
+                continue
+
+            if x in done_row:
+                continue
+            done_row.add(x)
+
+            for c, cost in edges[x]:
+                if c == row_col[x] or c in done_col:
+                    continue
+                nd = d + cost + pot_row[x] - pot_col[c]
+                if nd < dist_col.get(c, math.inf):
+                    dist_col[c] = nd
+                    prev[c] = x
+                    heapq.heappush(heap, (nd, 1, c))
+
+        # Keeps every residual reduced cost non-negative
+        for r in done_row:
+            pot_row[r] += dist_row[r] - reach
+        for c in done_col:
+            pot_col[c] += dist_col[c] - reach
+
+        c = target
+        while True:
+            r = prev[c]
+            next_c = row_col[r]
+            row_col[r] = c
+            col_row[c] = r
+            if r == root:
+                break
+            c = next_c
+
+    return row_col
+
+
+def _solve_block(block: List[int], candidate_lists, taken: set) -> Dict[int, Optional[Dict]]:
+    """
+    Best one-to-one choice for the OP matches of one block, maximising
+    the summed candidate probability. Leaving an OP match unassigned
+    scores 0, so it only loses its candidate to a better overall fit.
+    """
+
+    col_ids = {}
+    edges = []
+
+    for i in block:
+        row = []
+        for c in candidate_lists[i]:
+            b365_id = c.get("id")
+            if b365_id in taken:
+                continue
+            col = col_ids.setdefault(b365_id, len(col_ids))
+            row.append((col, 1.0 - _prob(c)))
+        edges.append(row)
+
+    # Private "unassigned" column per OP match, at the cost of profit 0
+    n_real = len(col_ids)
+    for r, row in enumerate(edges):
+        row.append((n_real + r, 1.0))
+
+    assigned = min_cost_assignment(edges, n_real + len(edges))
+
+    by_col = {col: b365_id for b365_id, col in col_ids.items()}
+    chosen = {}
+
+    for r, i in enumerate(block):
+        b365_id = by_col.get(assigned[r])
+        chosen[i] = None
+        if b365_id is not None:
+            taken.add(b365_id)
+            chosen[i] = next(c for c in candidate_lists[i] if c.get("id") == b365_id)
+
+    return chosen
+
+
+def assign_unique(
+    op_matches: Sequence[Dict],
+    candidate_lists: Sequence[Optional[List[Dict]]],
+    max_block: int = ASSIGN_MAX_BLOCK,
+) -> List[Optional[Dict]]:
+    """
+    Global one-to-one assignment of Bet365 candidates to OP matches.
+
+    The reranked candidate lists form a sparse OP x Bet365 score
+    graph; each connected component is solved on its own as a
+    min-cost matching, so no decision depends on input order. A
+    component with more than `max_block` OP matches is cut into
+    kickoff-ordered blocks, solved one after another.
+
+    Returns the chosen candidate (or None) for every OP match.
+    """
+
+    chosen = [None] * len(op_matches)
+    taken = set()
+
+    for component in _components(candidate_lists):
+
+        if len(component) > max_block:
+            component.sort(key=lambda i: (
+                op_matches[i].get("commence_time") is None,
+                int(op_matches[i].get("commence_time") or 0),
+                i,
+            ))
+
+        for start in range(0, len(component), max_block):
+            for i, candidate in _solve_block(component[start:start + max_block], candidate_lists, taken).items():
+                chosen[i] = candidate
+
+    return chosen
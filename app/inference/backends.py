@@ -0,0 +1,241 @@
+# app/inference/backends.py
+
+from pathlib import Path
+
+import numpy as np
+
+from config import INFERENCE_BACKEND, ONNX_MODEL_DIR
+
+ONNX_INT8 = "onnx-int8"
+TORCH = "torch"
+
+
+def backend_model_id(model_name: str, backend: str = INFERENCE_BACKEND) -> str:
+    """
+    Model id used for cache keys: vectors and scores from different
+    backends are close but not identical, so they never share entries.
+    Models loaded from a local directory (e.g. a distilled student)
+    also carry the directory's last write time, so retraining one in
+    place invalidates its cached scores.
+    """
+
+    model_id = model_name if backend == TORCH else f"{model_name}@{backend}"
+
+    path = Path(model_name)
+    if path.is_dir():
+        revision = max((f.stat().st_mtime_ns for f in path.iterdir() if f.is_file()), default=0)
+        model_id = f"{model_id}#{revision}"
+
+    return model_id
+
+
+def _onnx_dir(model_name: str) -> Path:
+    return Path(ONNX_MODEL_DIR) / model_name.replace("/", "__")
+
+
+def export_onnx(model_name: str, kind: str) -> Path:
+    """
+    Export a Hugging Face model to ONNX and quantize it to int8
+    (dynamic quantization, weights only).
+    kind is "sentence_encoder" or "cross_encoder".
+    Returns the path of the quantized model.
+    """
+
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    out_dir = _onnx_dir(model_name)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    fp32_path = out_dir / "model.onnx"
+    int8_path = out_dir / "model.int8.onnx"
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    if kind == "cross_encoder":
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        output_name = "logits"
+        output_axes = {0: "batch"}
+    else:
+        model = AutoModel.from_pretrained(model_name)
+        output_name = "last_hidden_state"
+        output_axes = {0: "batch", 1: "seq"}
+
+    model.config.return_dict = False
+    model.eval()
+
+    sample = dict(tokenizer(["sample text", "sample"], padding=True, return_tensors="pt"))
+    input_names = list(sample.keys())
+
+    dynamic_axes = {name: {0: "batch", 1: "seq"} for name in input_names}
+    dynamic_axes[output_name] = output_axes
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample,),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+
+    return int8_path
+
+
+class _OnnxModel:
+
+    def __init__(self, model_name: str, kind: str):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        model_dir = _onnx_dir(model_name)
+        model_path = model_dir / "model.int8.onnx"
+
+        if not model_path.exists():
+            print(f"Exporting {model_name} to ONNX int8...")
+            export_onnx(model_name, kind)
+
+        self.config = AutoConfig.from_pretrained(model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(
+            str(model_path),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.device = "cpu"
+
+    def _run(self, *texts, max_length):
+        encoded = self.tokenizer(
+            *texts,
+            padding=True,
+            truncation=True,
+            max_length=max_length,
+            return_tensors="np",
+        )
+        feeds = {
+            name: value.astype(np.int64)
+            for name, value in encoded.items()
+            if name in self.input_names
+        }
+        return self.session.run(None, feeds)[0], encoded["attention_mask"]
+
+
+class OnnxSentenceEncoder(_OnnxModel):
+    """
+    Drop-in for the parts of SentenceTransformer that SBERTIndex uses.
+    Mean pooling over the last hidden state, as all-MiniLM-L6-v2 does.
+    """
+
+    def __init__(self, model_name: str, max_length: int = 256):
+        super().__init__(model_name, "sentence_encoder")
+        self.max_length = max_length
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config.hidden_size
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False, normalize_embeddings=False):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        blocks = []
+        for start in range(0, len(texts), batch_size):
+            hidden, mask = self._run(texts[start:start + batch_size], max_length=self.max_length)
+            mask = mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            blocks.append(pooled)
+
+        embeddings = (
+            np.concatenate(blocks).astype(np.float32)
+            if blocks else np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        )
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        if single:
+            embeddings = embeddings[0]
+
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings)
+
+        return embeddings
+
+
+class OnnxCrossEncoder(_OnnxModel):
+    """
+    Drop-in for CrossEncoder.predict. Applies the same default
+    activation as sentence-transformers: sigmoid for single-label
+    models unless the config pins another one.
+    """
+
+    def __init__(self, model_name: str, max_length: int = 512):
+        super().__init__(model_name, "cross_encoder")
+        self.max_length = max_length
+
+        activation = getattr(self.config, "sbert_ce_default_activation_function", None)
+        if activation:
+            self.apply_sigmoid = activation.endswith("Sigmoid")
+        else:
+            self.apply_sigmoid = self.config.num_labels == 1
+
+    def predict(self, pairs, batch_size=32):
+        scores = []
+
+        for start in range(0, len(pairs), batch_size):
+            block = pairs[start:start + batch_size]
+            logits, _ = self._run(
+                [a for a, _ in block],
+                [b for _, b in block],
+                max_length=self.max_length,
+            )
+            if self.config.num_labels == 1:
+                logits = logits[:, 0]
+            scores.append(logits)
+
+        scores = np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+        if self.apply_sigmoid:
+            scores = 1 / (1 + np.exp(-scores))
+
+        return scores
+
+
+def _check_backend(backend: str):
+    if backend not in (TORCH, ONNX_INT8):
+        raise ValueError(f"Unknown inference backend: {backend!r} (expected {TORCH!r} or {ONNX_INT8!r})")
+
+
+def load_sentence_encoder(model_name: str, backend: str = INFERENCE_BACKEND):
+    _check_backend(backend)
+
+    if backend == ONNX_INT8:
+        return OnnxSentenceEncoder(model_name)
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def load_cross_encoder(model_name: str, backend: str = INFERENCE_BACKEND):
+    _check_backend(backend)
+
+    if backend == ONNX_INT8:
+        return OnnxCrossEncoder(model_name)
+
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name)
@@ -0,0 +1,139 @@
+# app/inference/decision_cache.py
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from config import DECISION_CACHE_FILE
+from app.inference.text_builder import build_text
+
+
+def match_version(match: Dict) -> str:
+    """
+    Hash of every field that feeds the engine for one match:
+    the text the models see and the kickoff the prefilter uses.
+    """
+    raw = f"{build_text(match)}|{match.get('commence_time')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint(op_match: Dict, candidates: Iterable[Dict]) -> str:
+    """
+    Fingerprint of one engine input: the OP match plus the id and
+    version of every prefiltered Bet365 candidate.
+    """
+
+    parts = [match_version(op_match)]
+    parts.extend(sorted(f"{c.get('id')}:{match_version(c)}" for c in candidates))
+
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """
+    Persisted run_engine results keyed by OP id.
+
+    An entry is reused only while its fingerprint matches; entries are
+    dropped when the model version changes, when feedback arrives for
+    the OP match, or when the OP match is no longer in the cycle.
+    """
+
+    def __init__(self, model_version: str, path: str = DECISION_CACHE_FILE):
+        self.model_version = model_version
+        self.path = Path(path)
+        self.entries = {}
+        self.feedback_log_id = None
+        self.feedback_offset = 0
+        self.touched = set()
+
+        self.hits = 0
+        self.misses = 0
+
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.feedback_log_id = data.get("feedback_log_id")
+        self.feedback_offset = data.get("feedback_offset", 0)
+
+        if data.get("model_version") != self.model_version:
+            print("Model version changed; decision cache cleared.")
+            return
+
+        self.entries = data.get("entries", {})
+
+    def get(self, op_id, fp: str) -> Optional[Dict]:
+        key = str(op_id)
+        self.touched.add(key)
+
+        entry = self.entries.get(key)
+        if entry is None or entry["fingerprint"] != fp:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def put(self, op_id, fp: str, candidates: Optional[List[Dict]], decision: str):
+        key = str(op_id)
+        self.touched.add(key)
+
+        self.entries[key] = {
+            "fingerprint": fp,
+            "decision": decision,
+            "candidates": [
+                {
+                    "id": c.get("id"),
+                    "final_score": c.get("final_score"),
+                    "swapped": c.get("swapped", False),
+                    "exact_match": c.get("exact_match", False),
+                }
+                for c in (candidates or [])
+            ],
+        }
+
+    def apply_feedback(self, log):
+        """
+        Invalidate OP matches with feedback logged since the last
+        cycle. `log` is the FeedbackLog; only lines past the offset
+        reached last time are read.
+        """
+
+        end = log.refresh()
+
+        if log.log_id != self.feedback_log_id or end < self.feedback_offset:
+            # Log was compacted or replaced; start over
+            self.feedback_offset = 0
+
+        invalidated = 0
+        for _, row in log.iter_entries(self.feedback_offset, end):
+            if self.entries.pop(str(row.get("provider_id")), None) is not None:
+                invalidated += 1
+
+        self.feedback_log_id = log.log_id
+        self.feedback_offset = end
+        return invalidated
+
+    def save(self):
+        # Only OP matches seen this cycle are kept
+        entries = {k: v for k, v in self.entries.items() if k in self.touched}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "model_version": self.model_version,
+                "feedback_log_id": self.feedback_log_id,
+                "feedback_offset": self.feedback_offset,
+                "entries": entries,
+            }, f)
+
+        os.replace(tmp, self.path)
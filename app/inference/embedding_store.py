@@ -0,0 +1,158 @@
+# app/inference/embedding_store.py
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from config import EMBEDDING_STORE_DIR
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk embedding store for one model.
+
+    Layout (one directory per model):
+        meta.json    {"model": ..., "dim": ...}
+        vectors.f32  raw float32 rows, read back through np.memmap
+        keys.txt     one key per line, line number == row offset
+
+    Keys are sha1(model name + text), so changing the model or the
+    text builder never serves a stale vector.
+    """
+
+    def __init__(self, model_name: str, dim: int, root: str = EMBEDDING_STORE_DIR):
+        self.model_name = model_name
+        self.dim = dim
+        self.dir = Path(root) / model_name.replace("/", "__")
+        self.vectors_path = self.dir / "vectors.f32"
+        self.keys_path = self.dir / "keys.txt"
+        self.meta_path = self.dir / "meta.json"
+
+        self.offsets = {}
+        self._vectors = None
+
+        # Set in worker processes that share the files with a parent;
+        # misses are still encoded, just not appended.
+        self.read_only = False
+
+        self._load()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _load(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        if self.meta_path.exists():
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") != self.dim:
+                raise ValueError(
+                    f"Embedding store {self.dir} has dim {meta.get('dim')}, expected {self.dim}"
+                )
+        else:
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+
+        keys = []
+        if self.keys_path.exists():
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                keys = [line.strip() for line in f if line.strip()]
+
+        row_bytes = self.dim * 4
+        stored_rows = (
+            self.vectors_path.stat().st_size // row_bytes
+            if self.vectors_path.exists() else 0
+        )
+
+        # A crash between the two appends leaves them out of step;
+        # keep only rows present in both files.
+        rows = min(len(keys), stored_rows)
+
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size != rows * row_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(rows * row_bytes)
+
+        if len(keys) != rows:
+            keys = keys[:rows]
+            with open(self.keys_path, "w", encoding="utf-8") as f:
+                f.writelines(k + "\n" for k in keys)
+
+        self.offsets = {k: i for i, k in enumerate(keys)}
+
+    def _matrix(self):
+        if self._vectors is None and self.offsets:
+            self._vectors = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self.offsets), self.dim),
+            )
+        return self._vectors
+
+    def lookup(self, texts: List[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Returns a (len(texts) x dim) array filled with every stored
+        vector, and the positions of texts that still need encoding.
+        """
+
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        missing = []
+
+        matrix = self._matrix()
+        hit_pos, hit_rows = [], []
+
+        for i, text in enumerate(texts):
+            row = self.offsets.get(self.key(text))
+            if row is None:
+                missing.append(i)
+            else:
+                hit_pos.append(i)
+                hit_rows.append(row)
+
+        if hit_rows:
+            out[hit_pos] = matrix[hit_rows]
+
+        return out, missing
+
+    def add(self, texts: List[str], vectors: np.ndarray):
+        if self.read_only:
+            return
+
+        new_keys, new_rows = [], []
+        seen = set()
+
+        for text, vec in zip(texts, vectors):
+            k = self.key(text)
+            if k in self.offsets or k in seen:
+                continue
+            seen.add(k)
+            new_keys.append(k)
+            new_rows.append(vec)
+
+        if not new_keys:
+            return
+
+        block = np.asarray(new_rows, dtype=np.float32).reshape(len(new_keys), self.dim)
+
+        # Vectors first, keys second: a key is only visible once its row exists.
+        with open(self.vectors_path, "ab") as f:
+            f.write(block.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.writelines(k + "\n" for k in new_keys)
+
+        start = len(self.offsets)
+        for i, k in enumerate(new_keys):
+            self.offsets[k] = start + i
+
+        self._vectors = None
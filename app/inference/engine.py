@@ -1,28 +1,529 @@
-from app.inference.prefilter import prefilter
+import hashlib
+
+from config import (
+    ANN_MISSING_KICKOFF_PENALTY,
+    ANN_NPROBE,
+    ANN_OVERFETCH,
+    ANN_TIME_PENALTY_PER_HOUR,
+    CROSS_ENCODER_MODEL_NAME,
+    EXACT_KICKOFF_TOLERANCE_MIN,
+    EXACT_MATCH_SCORE,
+    KICKOFF_WINDOW_MIN,
+    LEXICAL_BANDS,
+    LEXICAL_MIN_POOL,
+    LEXICAL_NGRAM,
+    LEXICAL_ROWS,
+    MIN_MARGIN,
+    MIN_SCORE,
+    SBERT_MODEL_NAME,
+    USE_ANN_FALLBACK,
+    USE_EXACT_JOIN,
+    USE_LEXICAL_BLOCKING,
+    USE_TEAM_ALIASES,
+)
+from app.inference.ann_index import GlobalIndex
+from app.inference.backends import backend_model_id
+from app.inference.exact_join import ExactIndex
+from app.inference.lexical_blocking import LexicalIndex
+from app.inference.prefilter import PrefilterIndex, sweep_join
 from app.inference.text_builder import build_text
-from app.inference.sbert_index import SBERTIndex
-from app.inference.reranker import Reranker
 from app.inference.gates import apply_gates
+from app.inference.registry import registry
+
+pool_index = None
+exact_index = None
+lexical_index = None
+ann_index = None
+aliases = None
+
+# Live pool rows by Bet365 id, and rows taken out of retrieval
+pool_rows = {}
+retired_rows = set()
+
+def model_version():
+    """
+    Everything that changes run_engine's output for the same inputs:
+    models, backend and gate settings. Cached decisions made under
+    another version are discarded.
+    """
+    parts = [
+        backend_model_id(SBERT_MODEL_NAME),
+        backend_model_id(CROSS_ENCODER_MODEL_NAME),
+        f"window={KICKOFF_WINDOW_MIN}",
+        f"min_score={MIN_SCORE}",
+        f"min_margin={MIN_MARGIN}",
+        f"exact={USE_EXACT_JOIN}:{EXACT_KICKOFF_TOLERANCE_MIN}",
+        f"lexical={USE_LEXICAL_BLOCKING}:{LEXICAL_MIN_POOL}:{LEXICAL_NGRAM}:{LEXICAL_BANDS}x{LEXICAL_ROWS}",
+        f"ann={USE_ANN_FALLBACK}:{ANN_NPROBE}:{ANN_OVERFETCH}:{ANN_TIME_PENALTY_PER_HOUR}:{ANN_MISSING_KICKOFF_PENALTY}",
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def get_aliases():
+    """
+    Team-alias lookup, loaded from disk on first use (or at startup).
+    """
+    global aliases
+
+    if USE_TEAM_ALIASES and aliases is None:
+        from app.feedback.aliases import TeamAliases
+        aliases = TeamAliases()
+
+    return aliases
+
+def rewrite_op(op_match):
+    """
+    OP match with team names mapped through learned aliases; every
+    later stage (exact join, SBERT, reranker) sees the rewritten names.
+    """
+    store = get_aliases()
+    return store.rewrite(op_match) if store is not None else op_match
+
+def index_pool(bet365_matches):
+    """
+    Encode the Bet365 pool and build its kickoff index once.
+    Call at the start of a cycle; run_engine does it lazily if the
+    pool has not been indexed yet.
+    """
+    global pool_index, exact_index, lexical_index, ann_index, pool_rows, retired_rows
+
+    sbert = registry.sbert()
+    sbert.build_corpus(bet365_matches)
+    pool_index = PrefilterIndex(bet365_matches)
+    exact_index = ExactIndex(bet365_matches) if USE_EXACT_JOIN else None
+    lexical_index = LexicalIndex(bet365_matches) if USE_LEXICAL_BLOCKING else None
+
+    ann_index = None
+    if USE_ANN_FALLBACK:
+        vectors = sbert.corpus_embeddings.cpu().numpy()
+        ann_index = GlobalIndex(vectors.shape[1])
+        ann_index.add(list(range(len(bet365_matches))), vectors, [m.get("sport") for m in bet365_matches])
+
+    pool_rows = {}
+    retired_rows = set()
+    _track(bet365_matches, 0)
+
+def _track(bet365_matches, start):
+    # A Bet365 id seen again replaces its earlier row
+    replaced = []
+    for i in range(start, len(bet365_matches)):
+        b365_id = bet365_matches[i].get("id")
+        if b365_id is None:
+            continue
+        if b365_id in pool_rows:
+            replaced.append(pool_rows[b365_id])
+        pool_rows[b365_id] = i
+
+    if replaced:
+        retire_pool(bet365_matches, replaced)
+
+def _pool_key(match):
+    return build_text(match), match.get("commence_time")
+
+def extend_pool(bet365_matches, new_matches):
+    """
+    Append matches to an indexed pool in place: only the new
+    rows are encoded and inserted into the kickoff index. A match
+    whose id is already in the pool replaces the old row.
+    """
+
+    sbert = registry.sbert()
+
+    if not sbert.has_corpus(bet365_matches):
+        bet365_matches.extend(new_matches)
+        index_pool(bet365_matches)
+        return
+
+    start = len(bet365_matches)
+    bet365_matches.extend(new_matches)
+    sbert.extend_corpus(new_matches)
+    pool_index.add(new_matches, start)
+    if exact_index is not None:
+        exact_index.add(new_matches, start)
+    if lexical_index is not None:
+        lexical_index.add(new_matches, start)
+    if ann_index is not None:
+        ann_index.add(
+            list(range(start, len(bet365_matches))),
+            sbert.corpus_embeddings[start:].cpu().numpy(),
+            [m.get("sport") for m in new_matches],
+        )
+
+    _track(bet365_matches, start)
+
+def retire_pool(bet365_matches, rows):
+    """
+    Take pool rows out of retrieval (fixtures that left the feed).
+    Rows keep their position in the list, so nothing is re-encoded;
+    every index just stops returning them.
+    """
+
+    if not registry.sbert().has_corpus(bet365_matches):
+        return
+
+    rows = [r for r in rows if r not in retired_rows]
+
+    pool_index.remove(bet365_matches, rows)
+    if exact_index is not None:
+        exact_index.remove(bet365_matches, rows)
+    if lexical_index is not None:
+        lexical_index.remove(bet365_matches, rows)
+    if ann_index is not None:
+        ann_index.remove(rows)
+
+    for r in rows:
+        retired_rows.add(r)
+        b365_id = bet365_matches[r].get("id")
+        if pool_rows.get(b365_id) == r:
+            del pool_rows[b365_id]
+
+def sync_pool(bet365_matches, matches):
+    """
+    Bring an indexed pool in line with a fresh fetch of the whole
+    feed: fixtures that left it are retired, new or changed ones are
+    appended, unchanged ones keep their rows and indexes. Once retired
+    rows make up most of the list it is rebuilt from the live ones.
+    Returns (added, retired).
+    """
+
+    # Rows without an id cannot be mapped or diffed
+    matches = [m for m in matches if m.get("id") is not None]
+
+    if not registry.sbert().has_corpus(bet365_matches):
+        bet365_matches[:] = matches
+        index_pool(bet365_matches)
+        return len(matches), 0
+
+    fresh = {m["id"]: m for m in matches}
+    gone = [row for b365_id, row in pool_rows.items() if b365_id not in fresh]
+    new = [
+        m for b365_id, m in fresh.items()
+        if b365_id not in pool_rows
+        or _pool_key(bet365_matches[pool_rows[b365_id]]) != _pool_key(m)
+    ]
+    changed = sum(m["id"] in pool_rows for m in new)
+
+    retire_pool(bet365_matches, gone)
+    if new:
+        extend_pool(bet365_matches, new)
+
+    if len(retired_rows) > len(bet365_matches) // 2:
+        bet365_matches[:] = [m for r, m in enumerate(bet365_matches) if r not in retired_rows]
+        index_pool(bet365_matches)
+
+    return len(new), len(gone) + changed
+
+def _join(op_matches, bet365_matches):
+    # sweep_join walks the whole list, so it only fits a pool that
+    # has never had rows retired
+    if retired_rows:
+        return pool_index.pairs(op_matches)
+    return sweep_join(op_matches, bet365_matches)
+
+def flush_caches():
+    """
+    Persist on-disk caches. Call once at the end of a cycle.
+    """
+    if registry.is_loaded("reranker"):
+        registry.reranker().save_cache()
+
+def _build_candidates(bet365_matches, hits, diffs):
+    retrieved = []
+    for row, score in hits:
+        item = dict(bet365_matches[row])
+        item["time_diff_min"] = int(diffs[row])
+        item["sbert_score"] = float(score)
+        retrieved.append(item)
+    return retrieved
+
+def _exact_hit(op_match, bet365_matches):
+    """
+    Candidate list for an OP match that the exact index resolves on
+    its own, or None.
+    """
+
+    if exact_index is None:
+        return None
+
+    hit = exact_index.lookup(op_match)
+    if hit is None:
+        return None
+
+    row, swapped = hit
+    item = dict(bet365_matches[row])
+    item["time_diff_min"] = abs(int(item["commence_time"]) - int(op_match["commence_time"])) // 60
+    item["final_score"] = EXACT_MATCH_SCORE
+    item["swapped"] = swapped
+    item["exact_match"] = True
+    item["alias_match"] = op_match.get("aliased", False)
+
+    return [item]
+
+def is_exact(candidates):
+    return bool(candidates) and candidates[0].get("exact_match", False)
+
+def _global_jobs(op_matches, bet365_matches, sbert):
+    """
+    Global fallback for OP matches the kickoff window gave nothing
+    (kickoff missing or shifted): ANN search over the sport's whole
+    pool, ranked by cosine minus a kickoff-distance penalty. Returns
+    one (op_text, top-10 candidates) job per OP match.
+    """
+
+    op_texts = [build_text(m) for m in op_matches]
+    queries = sbert.encode(op_texts).cpu().numpy()
+
+    jobs = []
+    for op, op_text, query in zip(op_matches, op_texts, queries):
+        op_time = op.get("commence_time")
+
+        scored = []
+        for row, score in ann_index.search(op.get("sport"), query[None], ANN_OVERFETCH)[0]:
+            b365_time = bet365_matches[row].get("commence_time")
+
+            if op_time is None or b365_time is None:
+                diff = None
+                penalty = ANN_MISSING_KICKOFF_PENALTY
+            else:
+                diff = abs(int(b365_time) - int(op_time)) // 60
+                penalty = ANN_TIME_PENALTY_PER_HOUR * diff / 60
+
+            scored.append((score - penalty, row, score, diff))
+
+        scored.sort(key=lambda x: -x[0])
+
+        candidates = []
+        for adjusted, row, score, diff in scored[:10]:
+            item = dict(bet365_matches[row])
+            item["time_diff_min"] = diff
+            item["sbert_score"] = float(score)
+            item["global_score"] = float(adjusted)
+            item["global_fallback"] = True
+            candidates.append(item)
+
+        jobs.append((op_text, candidates))
+
+    return jobs
+
+def _decide(candidates):
+    decision = apply_gates(candidates)
 
-sbert = SBERTIndex()
-reranker = Reranker()
+    # Nothing found outside the kickoff window is auto-approved
+    if decision == "AUTO_MATCH" and candidates[0].get("global_fallback"):
+        return "NEED_REVIEW"
+
+    return decision
 
 def run_engine(op_match, bet365_matches):
 
-    filtered = prefilter(op_match, bet365_matches)
-    if not filtered:
-        return None, "NO_MATCH"
+    sbert = registry.sbert()
+
+    if not sbert.has_corpus(bet365_matches):
+        index_pool(bet365_matches)
+
+    op_match = rewrite_op(op_match)
+
+    # Exact hits, including ones found through aliases, skip the models
+    exact = _exact_hit(op_match, bet365_matches)
+    if exact is not None:
+        return exact, "AUTO_MATCH"
+
+    reranker = registry.reranker()
+
+    rows, diffs = pool_index.query(op_match)
 
-    for m in filtered:
-        m["text"] = build_text(m)
+    if rows:
+        if lexical_index is not None:
+            rows, diffs = lexical_index.filter_rows(op_match, rows, diffs)
 
-    sbert.build(filtered)
+        op_text = build_text(op_match)
+        hits = sbert.search_rows(op_text, rows, top_k=10)
+        retrieved = _build_candidates(bet365_matches, hits, dict(zip(rows, diffs)))
 
-    op_text = build_text(op_match)
-    retrieved = sbert.search(op_text, top_k=10)
+    elif ann_index is not None:
+        op_text, retrieved = _global_jobs([op_match], bet365_matches, sbert)[0]
+
+    else:
+        retrieved = []
+
+    if not retrieved:
+        return None, "NO_MATCH"
 
     reranked = reranker.rerank(op_text, retrieved)
 
-    decision = apply_gates(reranked)
+    decision = _decide(reranked)
+
+    return reranked, decision
+
+
+def _pairs_mask(pairs, n_candidates):
+    """
+    Dense (OP x B365) bool mask for a CandidatePairs block.
+    """
+    import torch
+
+    counts = torch.from_numpy(pairs.indptr[1:] - pairs.indptr[:-1])
+    op_rows = torch.repeat_interleave(torch.arange(len(pairs)), counts)
+
+    mask = torch.zeros((len(pairs), n_candidates), dtype=torch.bool)
+    mask[op_rows, torch.from_numpy(pairs.indices)] = True
+
+    return mask
+
+
+def candidate_pairs(op_matches):
+    """
+    CandidatePairs for a batch against the currently indexed pool.
+    """
+    return pool_index.pairs(op_matches)
+
+def _retrieve_chunk(op_matches, bet365_matches, block, start, sbert, skip=()):
+    """
+    SBERT top-10 for one CandidatePairs block. Returns the block rows
+    that have candidates (minus `skip`) and one (op_text, candidates)
+    job per row. Rows with an empty kickoff window go through the
+    global ANN fallback if it is enabled.
+    """
+
+    active = [
+        i for i in range(len(block))
+        if block.indptr[i + 1] > block.indptr[i] and i not in skip
+    ]
+    empty = [
+        i for i in range(len(block))
+        if block.indptr[i + 1] == block.indptr[i] and i not in skip
+    ]
+    jobs = []
+
+    if active:
+        mask = _pairs_mask(block, len(bet365_matches))[active]
+        op_texts = [build_text(op_matches[start + i]) for i in active]
+
+        for i, op_text, row_hits in zip(
+            active, op_texts, sbert.search_corpus_batch(op_texts, mask, top_k=10)
+        ):
+            indices, diffs = block.row(i)
+            jobs.append((op_text, _build_candidates(
+                bet365_matches, row_hits, dict(zip(indices.tolist(), diffs.tolist()))
+            )))
+
+    if empty and ann_index is not None:
+        fallback = _global_jobs([op_matches[start + i] for i in empty], bet365_matches, sbert)
+
+        # OP matches without any candidate never reach the models
+        for i, (op_text, candidates) in zip(empty, fallback):
+            if candidates:
+                active.append(i)
+                jobs.append((op_text, candidates))
+
+    return active, jobs
+
+def retrieve_batch(op_matches, bet365_matches, chunk_size=1024):
+    """
+    Prefilter and SBERT stages of run_engine_batch, without reranking.
+    Returns (op index, op_text, candidates) for every OP match that
+    has candidates: exactly the pairs the reranker would score.
+    """
+
+    if not bet365_matches:
+        return []
+
+    op_matches = [rewrite_op(m) for m in op_matches]
+    sbert = registry.sbert()
+
+    if not sbert.has_corpus(bet365_matches):
+        index_pool(bet365_matches)
+
+    pairs = _join(op_matches, bet365_matches)
+    if lexical_index is not None:
+        pairs, _ = lexical_index.filter_pairs(op_matches, pairs)
+
+    retrieved = []
+
+    for start in range(0, len(op_matches), chunk_size):
+        block = pairs.slice(start, min(start + chunk_size, len(op_matches)))
+        active, jobs = _retrieve_chunk(op_matches, bet365_matches, block, start, sbert)
+
+        for i, (op_text, candidates) in zip(active, jobs):
+            retrieved.append((start + i, op_text, candidates))
+
+    return retrieved
+
+def run_engine_batch(op_matches, bet365_matches, chunk_size=1024, pairs=None):
+    """
+    Many-to-many version of run_engine.
+    Candidate pairs come from sweep_join, or the kickoff index once
+    rows have been retired (or `pairs` if the caller already has them). Queries are encoded and searched in chunks of
+    `chunk_size` rows so the similarity matrix stays bounded.
+    Returns one (candidates, decision) tuple per OP match, in order.
+    """
+
+    if not bet365_matches:
+        return [(None, "NO_MATCH") for _ in op_matches]
+
+    # Sport and kickoff are untouched, so caller-built pairs still line up
+    op_matches = [rewrite_op(m) for m in op_matches]
+    sbert = registry.sbert()
+
+    if not sbert.has_corpus(bet365_matches):
+        index_pool(bet365_matches)
+
+    if pairs is None:
+        pairs = _join(op_matches, bet365_matches)
+
+    # Crowded kickoff windows shrink to lexically similar fixtures
+    if lexical_index is not None:
+        pairs, _ = lexical_index.filter_pairs(op_matches, pairs)
+
+    results = []
+
+    for start in range(0, len(op_matches), chunk_size):
+        end = min(start + chunk_size, len(op_matches))
+        block = pairs.slice(start, end)
+
+        # Exact-key hits are resolved before any model runs
+        exact = {}
+        for i in range(len(block)):
+            hit = _exact_hit(op_matches[start + i], bet365_matches)
+            if hit is not None:
+                exact[i] = hit
+
+        active, jobs = _retrieve_chunk(op_matches, bet365_matches, block, start, sbert, skip=exact)
+
+        # One pair queue for the whole chunk, scattered back before gating
+        reranked = dict(zip(active, registry.reranker().rerank_many(jobs))) if jobs else {}
+
+        for i in range(len(block)):
+            if i in exact:
+                results.append((exact[i], "AUTO_MATCH"))
+                continue
+
+            if i not in reranked:
+                results.append((None, "NO_MATCH"))
+                continue
+
+            results.append((reranked[i], _decide(reranked[i])))
+
+    return results
+
+def run_engine_batch_isolated(op_matches, bet365_matches, chunk_size=1024, pairs=None):
+    """
+    run_engine_batch, but one bad OP match cannot take the whole batch
+    down: if the batch raises, every match is retried on its own
+    through run_engine, and the ones that still fail come back as
+    (None, "ERROR").
+    """
+
+    try:
+        return run_engine_batch(op_matches, bet365_matches, chunk_size=chunk_size, pairs=pairs)
+    except Exception as e:
+        print(f"Batch inference failed ({e}); retrying match by match")
+
+    results = []
+    for op_match in op_matches:
+        try:
+            results.append(run_engine(op_match, bet365_matches))
+        except Exception as e:
+            print(f"Inference error for {op_match.get('id')}: {e}")
+            results.append((None, "ERROR"))
 
-    return reranked, decision
\ No newline at end of file
+    return results
@@ -0,0 +1,109 @@
+# app/inference/exact_join.py
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from config import EXACT_KICKOFF_TOLERANCE_MIN
+
+# Club-type affixes that never tell two teams apart on their own
+_DROP_TOKENS = {"fc", "cf", "afc"}
+
+
+def normalize_team(name: Optional[str]) -> str:
+    """
+    Case, accents, punctuation and spacing folded away; nothing that
+    could merge two different teams (women's, youth, reserve sides
+    keep their markers).
+    """
+
+    if not name:
+        return ""
+
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch)).lower()
+
+    tokens = re.sub(r"[^\w]+", " ", name).split()
+    return " ".join(t for t in tokens if t not in _DROP_TOKENS)
+
+
+class ExactIndex:
+    """
+    Hash map over the Bet365 pool keyed by
+    (sport, normalized home, normalized away, kickoff bucket).
+
+    Buckets are EXACT_KICKOFF_TOLERANCE_MIN wide; a lookup probes the
+    OP kickoff's bucket and its two neighbours in both orientations,
+    then keeps rows within the tolerance. Only a single unambiguous
+    row counts as a hit.
+    """
+
+    def __init__(self, candidates: List[Dict], tolerance_min: int = EXACT_KICKOFF_TOLERANCE_MIN):
+        self.bucket_sec = max(tolerance_min, 1) * 60
+        self.tolerance_sec = tolerance_min * 60
+        self.keys = defaultdict(list)
+        self.add(candidates, 0)
+
+    def _key(self, sport, home, away, bucket):
+        return ((sport or "").lower(), home, away, bucket)
+
+    def add(self, candidates: List[Dict], start: int):
+        """
+        Index candidates that were appended to the pool at `start`.
+        """
+
+        for i, m in enumerate(candidates, start=start):
+            home = normalize_team(m.get("home_team"))
+            away = normalize_team(m.get("away_team"))
+
+            if not home or not away or m.get("commence_time") is None:
+                continue
+
+            t = int(m["commence_time"])
+            self.keys[self._key(m.get("sport"), home, away, t // self.bucket_sec)].append((t, i))
+
+    def remove(self, candidates: List[Dict], rows: List[int]):
+        """
+        Drop pool rows; `candidates` is the pool they index into.
+        """
+
+        for i in rows:
+            m = candidates[i]
+            home = normalize_team(m.get("home_team"))
+            away = normalize_team(m.get("away_team"))
+
+            if not home or not away or m.get("commence_time") is None:
+                continue
+
+            t = int(m["commence_time"])
+            key = self._key(m.get("sport"), home, away, t // self.bucket_sec)
+            if (t, i) in self.keys.get(key, ()):
+                self.keys[key].remove((t, i))
+
+    def lookup(self, op_match: Dict) -> Optional[Tuple[int, bool]]:
+        """
+        (pool row, swapped) of the one Bet365 match that has the same
+        teams and kickoff as `op_match`, or None.
+        """
+
+        home = normalize_team(op_match.get("home_team"))
+        away = normalize_team(op_match.get("away_team"))
+
+        if not home or not away or home == away or op_match.get("commence_time") is None:
+            return None
+
+        t = int(op_match["commence_time"])
+        bucket = t // self.bucket_sec
+
+        hits = {}
+        for swapped, (a, b) in ((False, (home, away)), (True, (away, home))):
+            for probe in (bucket - 1, bucket, bucket + 1):
+                for kickoff, row in self.keys.get(self._key(op_match.get("sport"), a, b, probe), ()):
+                    if abs(kickoff - t) <= self.tolerance_sec:
+                        hits[row] = swapped
+
+        if len(hits) != 1:
+            return None
+
+        return next(iter(hits.items()))
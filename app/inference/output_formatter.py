@@ -19,5 +19,7 @@ def format_output(op, candidate, decision):
         "is_checked": False,
         "is_mapped": decision == "AUTO_MATCH",
         "reason": decision,
-        "switch": False
+        "switch": candidate.get("swapped", False),
+        # Exact-key hits skip the models; their confidence is nominal
+        "exact_match": candidate.get("exact_match", False),
     }
\ No newline at end of file
@@ -1,5 +1,10 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
+
+import numpy as np
+
 from config import KICKOFF_WINDOW_MIN
 
 def parse_time(ts):
@@ -21,4 +26,200 @@ def prefilter(op_match: Dict, candidates: List[Dict]) -> List[Dict]:
         m["time_diff_min"] = int(diff)
         results.append(m)
 
-    return results
\ No newline at end of file
+    return results
+
+class PrefilterIndex:
+    """
+    Same rule as prefilter(), built once per pool.
+    Per sport, kickoff times are kept sorted so each OP match is
+    a bisect range query instead of a scan of the whole pool.
+    """
+
+    def __init__(self, candidates: List[Dict], window_min: int = KICKOFF_WINDOW_MIN):
+        self.window_sec = window_min * 60
+
+        by_sport = defaultdict(list)
+        for i, m in enumerate(candidates):
+            # Kickoff-less candidates are only reachable through global retrieval
+            if m.get("commence_time") is None:
+                continue
+            by_sport[m["sport"].lower()].append((int(m["commence_time"]), i))
+
+        self.times = {}
+        self.rows = {}
+        for sport, items in by_sport.items():
+            items.sort()
+            self.times[sport] = [t for t, _ in items]
+            self.rows[sport] = [i for _, i in items]
+
+    def add(self, candidates: List[Dict], start: int):
+        """
+        Index candidates that were appended to the pool at `start`.
+        """
+
+        for i, m in enumerate(candidates, start=start):
+            if m.get("commence_time") is None:
+                continue
+
+            sport = m["sport"].lower()
+            t = int(m["commence_time"])
+
+            times = self.times.setdefault(sport, [])
+            rows = self.rows.setdefault(sport, [])
+
+            pos = bisect_right(times, t)
+            times.insert(pos, t)
+            rows.insert(pos, i)
+
+    def remove(self, candidates: List[Dict], rows: List[int]):
+        """
+        Drop pool rows (e.g. fixtures that left the feed); `candidates`
+        is the pool they index into.
+        """
+
+        for i in rows:
+            m = candidates[i]
+            if m.get("commence_time") is None:
+                continue
+
+            sport = m["sport"].lower()
+            t = int(m["commence_time"])
+            times = self.times.get(sport, [])
+            sport_rows = self.rows.get(sport, [])
+
+            pos = bisect_left(times, t)
+            while pos < len(times) and times[pos] == t:
+                if sport_rows[pos] == i:
+                    del times[pos], sport_rows[pos]
+                    break
+                pos += 1
+
+    def pairs(self, op_matches: List[Dict]) -> "CandidatePairs":
+        """
+        CandidatePairs for a batch, one bisect query per OP match.
+        Cheaper than sweep_join when the batch is small next to the pool.
+        """
+
+        indptr = [0]
+        indices, diffs = [], []
+
+        for op in op_matches:
+            rows, row_diffs = self.query(op)
+            indices.extend(rows)
+            diffs.extend(row_diffs)
+            indptr.append(len(indices))
+
+        return CandidatePairs(
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            np.asarray(diffs, dtype=np.int64),
+        )
+
+    def query(self, op_match: Dict) -> Tuple[List[int], List[int]]:
+        """
+        Returns (candidate indices, time_diff_min) for one OP match.
+        """
+
+        times = self.times.get(op_match["sport"].lower())
+        if not times or op_match.get("commence_time") is None:
+            return [], []
+
+        t = int(op_match["commence_time"])
+        lo = bisect_left(times, t - self.window_sec)
+        hi = bisect_right(times, t + self.window_sec)
+
+        rows = self.rows[op_match["sport"].lower()][lo:hi]
+        diffs = [abs(x - t) // 60 for x in times[lo:hi]]
+
+        return rows, diffs
+
+
+class CandidatePairs:
+    """
+    CSR-style OP x B365 candidate pairs.
+    Row i (an OP match) owns indices[indptr[i]:indptr[i + 1]];
+    time_diff holds the kickoff difference in minutes for each pair.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, time_diff: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.time_diff = time_diff
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.time_diff[start:end]
+
+    def slice(self, start: int, end: int) -> "CandidatePairs":
+        lo, hi = self.indptr[start], self.indptr[end]
+        return CandidatePairs(
+            self.indptr[start:end + 1] - lo,
+            self.indices[lo:hi],
+            self.time_diff[lo:hi],
+        )
+
+
+def sweep_join(
+    op_matches: List[Dict],
+    candidates: List[Dict],
+    window_min: int = KICKOFF_WINDOW_MIN,
+) -> CandidatePairs:
+    """
+    Every OP x B365 pair that prefilter() would keep, for a whole batch.
+    Both sides are sorted by (sport, kickoff) and merged with a
+    two-pointer sweep, so the cost is the sort plus the output size.
+    """
+
+    window_sec = window_min * 60
+
+    def keyed(matches):
+        return sorted(
+            (m["sport"].lower(), int(m["commence_time"]), i)
+            for i, m in enumerate(matches)
+            if m.get("commence_time") is not None
+        )
+
+    ops = keyed(op_matches)
+    b365 = keyed(candidates)
+
+    # OP matches without a kickoff keep an empty row
+    row_indices = [[] for _ in op_matches]
+    row_diffs = [[] for _ in op_matches]
+
+    lo = 0
+    for sport, t, op_i in ops:
+
+        # Drop candidates from earlier sports or too far in the past;
+        # OP rows are sorted the same way, so lo never moves back.
+        while lo < len(b365) and (
+            b365[lo][0] < sport
+            or (b365[lo][0] == sport and b365[lo][1] < t - window_sec)
+        ):
+            lo += 1
+
+        hi = lo
+        indices, diffs = [], []
+        while hi < len(b365) and b365[hi][0] == sport and b365[hi][1] <= t + window_sec:
+            indices.append(b365[hi][2])
+            diffs.append(abs(b365[hi][1] - t) // 60)
+            hi += 1
+
+        row_indices[op_i] = indices
+        row_diffs[op_i] = diffs
+
+    indptr = np.zeros(len(op_matches) + 1, dtype=np.int64)
+    for i, indices in enumerate(row_indices):
+        indptr[i + 1] = indptr[i] + len(indices)
+
+    return CandidatePairs(
+        indptr,
+        np.fromiter((j for row in row_indices for j in row), dtype=np.int64, count=int(indptr[-1])),
+        np.fromiter((d for row in row_diffs for d in row), dtype=np.int64, count=int(indptr[-1])),
+    )
@@ -0,0 +1,87 @@
+# app/inference/registry.py
+
+import threading
+import time
+from typing import Dict
+
+from config import WARMUP_SEQ_LENGTHS
+
+
+class ModelRegistry:
+    """
+    Loads the SBERT index and the reranker on first use (or on an
+    explicit warmup), so importing the engine does not pull in torch.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self.state = "idle"
+        self.error = None
+        self.warmup_seconds = None
+
+    def _load(self, name: str):
+        if name == "sbert":
+            from app.inference.sbert_index import SBERTIndex
+            return SBERTIndex()
+        if name == "reranker":
+            from app.inference.reranker import Reranker
+            return Reranker()
+        raise KeyError(name)
+
+    def get(self, name: str):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            return self._models[name]
+
+    def sbert(self):
+        return self.get("sbert")
+
+    def reranker(self):
+        return self.get("reranker")
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warmup(self, seq_lengths=WARMUP_SEQ_LENGTHS):
+        """
+        Load both models and run one dummy batch per sequence length,
+        so lazy kernel setup happens here and not on the first request.
+        """
+
+        self.state = "loading"
+        self.error = None
+        start = time.perf_counter()
+
+        try:
+            sbert = self.sbert()
+            reranker = self.reranker()
+
+            for n in seq_lengths:
+                text = " ".join(["team"] * n)
+                sbert.model.encode([text] * 8, normalize_embeddings=True)
+                reranker.model.predict([(text, text)] * 8)
+
+        except Exception as e:
+            self.state = "error"
+            self.error = str(e)
+            raise
+
+        self.warmup_seconds = round(time.perf_counter() - start, 3)
+        self.state = "ready"
+
+    def status(self) -> Dict:
+        return {
+            "state": self.state,
+            "loaded": sorted(self._models),
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+
+registry = ModelRegistry()
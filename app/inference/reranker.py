@@ -1,15 +1,74 @@
-from sentence_transformers import CrossEncoder
+from config import CROSS_ENCODER_MODEL_NAME, RERANK_BATCH_SIZE, USE_PAIR_CACHE
+from app.inference.backends import backend_model_id, load_cross_encoder
+from app.inference.score_cache import PairScoreCache
+
+MODEL_NAME = CROSS_ENCODER_MODEL_NAME
 
 class Reranker:
 
-    def __init__(self):
-        self.model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+    def __init__(self, model_name=MODEL_NAME, use_cache=USE_PAIR_CACHE):
+        self.model_name = model_name
+        self.model = load_cross_encoder(model_name)
+        self.cache = PairScoreCache(backend_model_id(model_name)) if use_cache else None
+
+    def _predict(self, pairs, batch_size):
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            block = pairs[start:start + batch_size]
+            scores.extend(float(s) for s in self.model.predict(block, batch_size=batch_size))
+        return scores
+
+    def score_pairs(self, pairs, batch_size=RERANK_BATCH_SIZE):
+        """
+        Cross-encoder scores for (text A, text B) pairs, predicted in
+        fixed-size batches; pairs already in the cache are not sent
+        to the model.
+        """
+
+        if self.cache is None:
+            return self._predict(pairs, batch_size)
+
+        scores = self.cache.get_many(pairs)
+        missing = [i for i, s in enumerate(scores) if s is None]
+
+        if missing:
+            new_pairs = [pairs[i] for i in missing]
+            new_scores = self._predict(new_pairs, batch_size)
+            self.cache.put_many(new_pairs, new_scores)
+
+            for i, score in zip(missing, new_scores):
+                scores[i] = score
+
+        return scores
 
     def rerank(self, op_text, candidates):
         pairs = [(op_text, c["text"]) for c in candidates]
-        scores = self.model.predict(pairs)
+        scores = self.score_pairs(pairs)
 
         for c, score in zip(candidates, scores):
             c["final_score"] = float(score)
 
-        return sorted(candidates, key=lambda x: x["final_score"], reverse=True)[:5]
\ No newline at end of file
+        return sorted(candidates, key=lambda x: x["final_score"], reverse=True)[:5]
+
+    def rerank_many(self, jobs, batch_size=RERANK_BATCH_SIZE):
+        """
+        Rerank many OP matches at once.
+        `jobs` is a list of (op_text, candidates); all pairs go through
+        one queue so the model sees a few large batches instead of one
+        small predict per OP match. Returns the reranked lists in order.
+        """
+
+        pairs = [(op_text, c["text"]) for op_text, candidates in jobs for c in candidates]
+        scores = iter(self.score_pairs(pairs, batch_size=batch_size))
+
+        results = []
+        for _, candidates in jobs:
+            for c in candidates:
+                c["final_score"] = next(scores)
+            results.append(sorted(candidates, key=lambda x: x["final_score"], reverse=True)[:5])
+
+        return results
+
+    def save_cache(self):
+        if self.cache is not None:
+            self.cache.save()
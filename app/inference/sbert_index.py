@@ -1,13 +1,29 @@
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
 import torch
 
+from config import SBERT_MODEL_NAME, USE_EMBEDDING_STORE
+from app.inference.backends import backend_model_id, load_sentence_encoder
+from app.inference.embedding_store import EmbeddingStore
+from app.inference.text_builder import build_text
+
+MODEL_NAME = SBERT_MODEL_NAME
+
 class SBERTIndex:
 
     def __init__(self):
-        self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        self.model = load_sentence_encoder(MODEL_NAME)
+        self.store = (
+            EmbeddingStore(backend_model_id(MODEL_NAME), self.model.get_sentence_embedding_dimension())
+            if USE_EMBEDDING_STORE else None
+        )
         self.embeddings = None
         self.matches = None
 
+        # Corpus mode: whole Bet365 pool encoded once per cycle
+        self.corpus = None
+        self.corpus_rows = {}
+        self.corpus_embeddings = None
+
     def build(self, matches):
         self.matches = matches
         texts = [m["text"] for m in matches]
@@ -24,4 +40,134 @@ class SBERTIndex:
             item["sbert_score"] = float(score)
             results.append(item)
 
-        return results
\ No newline at end of file
+        return results
+
+    def encode(self, texts):
+        """
+        Normalized embeddings for `texts`, reusing the on-disk store
+        so only texts never seen before hit the model.
+        """
+
+        if self.store is None:
+            return self.model.encode(texts, convert_to_tensor=True, normalize_embeddings=True)
+
+        vectors, missing = self.store.lookup(texts)
+
+        if missing:
+            new_texts = [texts[i] for i in missing]
+            new_vectors = self.model.encode(new_texts, normalize_embeddings=True)
+            self.store.add(new_texts, new_vectors)
+            vectors[missing] = new_vectors
+
+        return torch.from_numpy(vectors).to(self.model.device)
+
+    def build_corpus(self, matches):
+        """
+        Encode the whole pool into one normalized embedding matrix.
+        Rows are looked up by object identity, so the prefilter output
+        (which returns the pool's own dicts) maps straight back to them.
+        """
+
+        for m in matches:
+            if "text" not in m:
+                m["text"] = build_text(m)
+
+        self.corpus = matches
+        self.corpus_rows = {id(m): i for i, m in enumerate(matches)}
+        self.corpus_embeddings = self.encode([m["text"] for m in matches])
+        self._buffer = self.corpus_embeddings
+
+    def extend_corpus(self, matches):
+        """
+        Add matches that were just appended to the corpus list.
+        Embeddings live in a buffer that doubles when full, so a pool
+        built page by page is not copied on every page.
+        """
+
+        for m in matches:
+            if "text" not in m:
+                m["text"] = build_text(m)
+
+        size = self.corpus_embeddings.shape[0]
+        start = len(self.corpus) - len(matches)
+        for i, m in enumerate(matches, start=start):
+            self.corpus_rows[id(m)] = i
+
+        new = self.encode([m["text"] for m in matches])
+        needed = size + new.shape[0]
+
+        if needed > self._buffer.shape[0]:
+            buffer = torch.empty(
+                (max(needed, 2 * self._buffer.shape[0], 1024), new.shape[1]),
+                dtype=new.dtype,
+                device=new.device,
+            )
+            buffer[:size] = self.corpus_embeddings
+            self._buffer = buffer
+
+        self._buffer[size:needed] = new
+        self.corpus_embeddings = self._buffer[:needed]
+
+    def has_corpus(self, matches):
+        return self.corpus is matches
+
+    def search_corpus(self, query_text, subset, top_k=10):
+        """
+        Cosine search restricted to `subset` (dicts taken from the corpus).
+        """
+
+        rows = [self.corpus_rows[id(m)] for m in subset]
+
+        results = []
+        for row, score in self.search_rows(query_text, rows, top_k=top_k):
+            item = dict(self.corpus[row])
+            item["sbert_score"] = score
+            results.append(item)
+
+        return results
+
+    def search_rows(self, query_text, rows, top_k=10):
+        """
+        Cosine search restricted to the given corpus rows.
+        Returns (corpus_row, score) pairs, best first.
+        """
+
+        if not rows:
+            return []
+
+        row_idx = torch.tensor(rows, device=self.corpus_embeddings.device)
+
+        query_emb = self.encode([query_text])[0]
+        scores = self.corpus_embeddings.index_select(0, row_idx) @ query_emb
+        top_scores, top_idx = torch.topk(scores, k=min(top_k, len(rows)))
+
+        return [
+            (rows[idx], float(score))
+            for score, idx in zip(top_scores.tolist(), top_idx.tolist())
+        ]
+
+    def search_corpus_batch(self, query_texts, mask, top_k=10):
+        """
+        Batched version of search_corpus.
+        `mask` is a bool tensor (len(query_texts) x corpus size); rows
+        outside the mask never make it into the top-k.
+        Returns one list of (corpus_row, score) per query.
+        """
+
+        query_embs = self.encode(query_texts)
+
+        scores = query_embs @ self.corpus_embeddings.T
+        scores = scores.masked_fill(~mask.to(scores.device), float("-inf"))
+
+        k = min(top_k, scores.shape[1])
+        top_scores, top_idx = torch.topk(scores, k=k, dim=1)
+
+        results = []
+        for row_scores, row_idx in zip(top_scores.tolist(), top_idx.tolist()):
+            results.append([
+                (idx, score)
+                for score, idx in zip(row_scores, row_idx)
+                if score != float("-inf")
+            ])
+
+        return results
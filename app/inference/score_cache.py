@@ -0,0 +1,148 @@
+# app/inference/score_cache.py
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import PAIR_CACHE_FILE, PAIR_CACHE_MAX_ENTRIES, PAIR_CACHE_TTL_SEC
+
+
+class PairScoreCache:
+    """
+    Cross-encoder scores keyed by sha1(model id, text A, text B).
+
+    LRU with a hard entry bound and a TTL; optionally persisted to a
+    JSON file so scores survive between cron cycles.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_entries: int = PAIR_CACHE_MAX_ENTRIES,
+        ttl_sec: Optional[int] = PAIR_CACHE_TTL_SEC,
+        path: Optional[str] = PAIR_CACHE_FILE,
+    ):
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.path = Path(path) if path else None
+
+        self.entries = OrderedDict()
+        # Keys put since the last take_new(), for merging across processes
+        self.new_keys = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.load()
+
+    def key(self, text_a: str, text_b: str) -> str:
+        raw = "\x00".join((self.model_id, text_a, text_b))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_sec is not None and now - stored_at > self.ttl_sec
+
+    def get_many(self, pairs: Iterable[Tuple[str, str]]) -> List[Optional[float]]:
+        now = time.time()
+        scores = []
+
+        for a, b in pairs:
+            k = self.key(a, b)
+            entry = self.entries.get(k)
+
+            if entry is None or self._expired(entry[1], now):
+                if entry is not None:
+                    del self.entries[k]
+                self.misses += 1
+                scores.append(None)
+                continue
+
+            self.entries.move_to_end(k)
+            self.hits += 1
+            scores.append(entry[0])
+
+        return scores
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]], scores: Iterable[float]):
+        now = time.time()
+
+        for (a, b), score in zip(pairs, scores):
+            k = self.key(a, b)
+            self.entries[k] = (float(score), now)
+            self.entries.move_to_end(k)
+            self.new_keys[k] = None
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def take_new(self) -> List:
+        """
+        [key, (score, stored_at)] for every entry put since the last
+        call, e.g. to send a worker's scores back to its parent.
+        """
+
+        new = [[k, self.entries[k]] for k in self.new_keys if k in self.entries]
+        self.new_keys = {}
+        return new
+
+    def merge(self, entries: Iterable):
+        """
+        Add entries taken from another cache with take_new().
+        """
+
+        for k, (score, stored_at) in entries:
+            self.entries[k] = (score, stored_at)
+            self.entries.move_to_end(k)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def load(self):
+        if self.path is None or not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("model_id") != self.model_id:
+            return
+
+        now = time.time()
+        for k, (score, stored_at) in data.get("entries", []):
+            if not self._expired(stored_at, now):
+                self.entries[k] = (score, stored_at)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+
+        # Entries are written oldest first so LRU order survives a reload
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "model_id": self.model_id,
+                "entries": [[k, list(v)] for k, v in self.entries.items()],
+            }, f)
+
+        os.replace(tmp, self.path)
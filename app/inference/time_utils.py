@@ -4,4 +4,6 @@ from datetime import datetime, timezone
 
 
 def unix_to_iso(ts: int) -> str:
+    if ts is None:
+        return None
     return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
@@ -0,0 +1,188 @@
+# app/integration/async_fetcher.py
+
+import asyncio
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from config import (
+    DEFAULT_LIMIT,
+    FETCH_CONCURRENCY_PER_HOST,
+    FETCH_RETRIES,
+    REQUEST_TIMEOUT,
+)
+from app.integration.fetcher import HEADERS
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """
+    A page that could not be fetched. A feed with a missing page is
+    incomplete, so callers should skip the cycle rather than treat
+    the missing rows as gone.
+    """
+
+    def __init__(self, url: str, page: int, reason):
+        super().__init__(f"page {page} of {url}: {reason}")
+        self.url = url
+        self.page = page
+
+
+class PageFetcher:
+    """
+    Fetches paginated feeds concurrently.
+
+    Page 1 of each feed is fetched first; its totalPages decides which
+    pages to schedule next. Requests to the same host share one
+    semaphore, so FETCH_CONCURRENCY_PER_HOST caps parallelism per host
+    no matter how many feeds live there.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        concurrency_per_host: int = FETCH_CONCURRENCY_PER_HOST,
+        retries: int = FETCH_RETRIES,
+        limit: int = DEFAULT_LIMIT,
+    ):
+        self.session = session
+        self.concurrency_per_host = concurrency_per_host
+        self.retries = retries
+        self.limit = limit
+        self.semaphores = {}
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.concurrency_per_host)
+        return self.semaphores[host]
+
+    async def fetch_page(self, url: str, page: int) -> Dict:
+        """
+        One page's "data" object. Raises FetchError if the API refuses
+        the page, or it still fails after retries.
+        """
+
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore(url):
+                    async with self.session.get(
+                        url,
+                        params={"page": page, "limit": self.limit},
+                    ) as response:
+
+                        if response.status in RETRY_STATUSES:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info,
+                                response.history,
+                                status=response.status,
+                            )
+
+                        if response.status >= 400:
+                            raise FetchError(url, page, f"HTTP {response.status}")
+
+                        # A truncated body fails to parse; retried
+                        body = await response.json(content_type=None)
+
+                if not isinstance(body, dict) or not body.get("status"):
+                    raise FetchError(url, page, "response status is not OK")
+
+                return body.get("data") or {}
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                if attempt == self.retries:
+                    raise FetchError(url, page, e) from e
+
+                await asyncio.sleep(1.5 ** attempt)
+
+    async def fetch_feed(self, url: str, max_pages: Optional[int] = None) -> List[Dict]:
+        """
+        Every row of the feed, in page order. Raises FetchError if any
+        page fails.
+        """
+
+        first = await self.fetch_page(url, 1)
+        if not first:
+            return []
+
+        total_pages = first.get("totalPages") or 1
+        if max_pages is not None:
+            total_pages = min(total_pages, max_pages)
+
+        rest = await asyncio.gather(*[
+            self.fetch_page(url, page)
+            for page in range(2, total_pages + 1)
+        ])
+
+        # gather keeps submission order, so rows come back in page order
+        rows = list(first.get("rows", []))
+        for data in rest:
+            rows.extend(data.get("rows", []))
+
+        return rows
+
+
+    async def iter_pages(self, url: str, max_pages: Optional[int] = None, window: Optional[int] = None):
+        """
+        Async generator of row lists, one per page, in page order.
+        At most `window` pages (default: the per-host concurrency) are
+        in flight or waiting to be yielded; the next page is scheduled
+        only as one is yielded, so a slow consumer stops the fetching.
+        Raises FetchError at the first page that fails.
+        """
+
+        first = await self.fetch_page(url, 1)
+        if not first:
+            return
+
+        yield list(first.get("rows", []))
+
+        total_pages = first.get("totalPages") or 1
+        if max_pages is not None:
+            total_pages = min(total_pages, max_pages)
+
+        window = max(1, window or self.concurrency_per_host)
+        next_page = 2
+        tasks = deque()
+
+        def schedule():
+            nonlocal next_page
+            while len(tasks) < window and next_page <= total_pages:
+                tasks.append(asyncio.ensure_future(self.fetch_page(url, next_page)))
+                next_page += 1
+
+        try:
+            schedule()
+            while tasks:
+                data = await tasks.popleft()
+                yield list(data.get("rows", []))
+                schedule()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def fetch_feeds_async(urls: Dict[str, str], max_pages: Optional[int] = None) -> Dict[str, List[Dict]]:
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+        fetcher = PageFetcher(session)
+        names = list(urls)
+        feeds = await asyncio.gather(*[
+            fetcher.fetch_feed(urls[name], max_pages=max_pages)
+            for name in names
+        ])
+
+    return dict(zip(names, feeds))
+
+
+def fetch_feeds(urls: Dict[str, str], max_pages: Optional[int] = None) -> Dict[str, List[Dict]]:
+    """
+    Fetch several paginated feeds at once, e.g.
+    fetch_feeds({"bet365": BET365_URL, "oddsportal": ODDSPORTAL_URL}).
+    Raises FetchError rather than return a feed with pages missing.
+    """
+    return asyncio.run(fetch_feeds_async(urls, max_pages=max_pages))
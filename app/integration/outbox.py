@@ -0,0 +1,312 @@
+# app/integration/outbox.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    OUTBOX_DB,
+    PUSH_MAX_ATTEMPTS,
+    PUSH_RATE_PER_SEC,
+    PUSH_WORKERS,
+    REQUEST_TIMEOUT,
+)
+
+HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "User-Agent": "AI-Mapping-Engine/1.0",
+}
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+SENT = "sent"
+FAILED = "failed"
+
+
+def payload_hash(row: Dict) -> str:
+    return hashlib.sha1(json.dumps(row, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Outbox:
+    """
+    Durable push queue in SQLite, one row per provider_id.
+
+    Enqueueing the same provider_id again replaces its payload and
+    resets its attempts; an unchanged payload (pending, in flight,
+    failed or already sent) is left as it is. Rows left in flight by a crash go back to pending on open.
+    """
+
+    def __init__(self, path: str = OUTBOX_DB):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                provider_id TEXT PRIMARY KEY,
+                payload     TEXT NOT NULL,
+                hash        TEXT NOT NULL,
+                sent_hash   TEXT,
+                status      TEXT NOT NULL,
+                attempts    INTEGER NOT NULL DEFAULT 0,
+                retry_at    REAL NOT NULL DEFAULT 0,
+                last_error  TEXT,
+                updated_at  REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status)")
+
+        with self.db:
+            self.db.execute(
+                "UPDATE outbox SET status = ? WHERE status = ?",
+                (PENDING, IN_FLIGHT),
+            )
+
+    def enqueue(self, rows: Iterable[Dict]) -> Dict:
+        counts = {"queued": 0, "unchanged": 0}
+        now = time.time()
+
+        with self.db:
+            for row in rows:
+                provider_id = str(row["provider_id"])
+                h = payload_hash(row)
+
+                existing = self.db.execute(
+                    "SELECT hash, sent_hash, status FROM outbox WHERE provider_id = ?",
+                    (provider_id,),
+                ).fetchone()
+
+                if existing is not None:
+                    # Same payload: leave status and attempts alone, so a
+                    # row the server rejected stays failed
+                    old_hash, sent_hash, status = existing
+                    if old_hash == h:
+                        counts["unchanged"] += 1
+                        continue
+
+                    # Back to what the server already has: drop the newer
+                    # queued payload. One in flight may still land, so
+                    # that case is queued again below.
+                    if sent_hash == h and status != IN_FLIGHT:
+                        self.db.execute(
+                            """
+                            UPDATE outbox SET payload = ?, hash = ?, status = ?, attempts = 0,
+                                retry_at = 0, last_error = NULL, updated_at = ?
+                            WHERE provider_id = ?
+                            """,
+                            (json.dumps(row), h, SENT, now, provider_id),
+                        )
+                        counts["unchanged"] += 1
+                        continue
+
+                self.db.execute(
+                    """
+                    INSERT INTO outbox (provider_id, payload, hash, status, attempts, updated_at)
+                    VALUES (?, ?, ?, ?, 0, ?)
+                    ON CONFLICT (provider_id) DO UPDATE SET
+                        payload = excluded.payload,
+                        hash = excluded.hash,
+                        status = excluded.status,
+                        attempts = 0,
+                        retry_at = 0,
+                        last_error = NULL,
+                        updated_at = excluded.updated_at
+                    """,
+                    (provider_id, json.dumps(row), h, PENDING, now),
+                )
+                counts["queued"] += 1
+
+        return counts
+
+    def claim(self, limit: int):
+        """
+        Mark up to `limit` pending rows that are due as in flight and
+        return them as (provider_id, hash, payload dict).
+        """
+
+        with self.db:
+            rows = self.db.execute(
+                """
+                SELECT provider_id, hash, payload FROM outbox
+                WHERE status = ? AND retry_at <= ?
+                ORDER BY updated_at LIMIT ?
+                """,
+                (PENDING, time.time(), limit),
+            ).fetchall()
+
+            self.db.executemany(
+                "UPDATE outbox SET status = ? WHERE provider_id = ?",
+                [(IN_FLIGHT, r[0]) for r in rows],
+            )
+
+        return [(pid, h, json.loads(payload)) for pid, h, payload in rows]
+
+    def mark_sent(self, provider_id: str, h: str):
+        with self.db:
+            self.db.execute(
+                """
+                UPDATE outbox SET status = ?, sent_hash = ?, last_error = NULL, updated_at = ?
+                WHERE provider_id = ? AND hash = ?
+                """,
+                (SENT, h, time.time(), provider_id, h),
+            )
+
+    def mark_failed(self, provider_id: str, h: str, error: str, max_attempts: int = PUSH_MAX_ATTEMPTS):
+        """
+        Back to pending with exponential backoff, or failed once
+        `max_attempts` is reached.
+        """
+
+        now = time.time()
+
+        with self.db:
+            self.db.execute(
+                """
+                UPDATE outbox SET
+                    attempts = attempts + 1,
+                    status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END,
+                    retry_at = ? + (1 << MIN(attempts, 10)) * 30,
+                    last_error = ?,
+                    updated_at = ?
+                WHERE provider_id = ? AND hash = ?
+                """,
+                (max_attempts, FAILED, PENDING, now, error[:500], now, provider_id, h),
+            )
+
+    def retry_failed(self) -> int:
+        with self.db:
+            cur = self.db.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, retry_at = 0 WHERE status = ?",
+                (PENDING, FAILED),
+            )
+        return cur.rowcount
+
+    def stats(self) -> Dict:
+        counts = dict(self.db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return {s: counts.get(s, 0) for s in (PENDING, IN_FLIGHT, SENT, FAILED)}
+
+    def close(self):
+        self.db.close()
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1 / rate seconds apart across threads.
+    """
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+
+        if at > now:
+            time.sleep(at - now)
+
+
+def create_push_session(pool_size: int = PUSH_WORKERS) -> requests.Session:
+    session = requests.Session()
+
+    retries = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+    )
+
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(HEADERS)
+
+    return session
+
+
+def _post(session, limiter, url, provider_id, h, payload):
+    limiter.wait()
+
+    try:
+        response = session.post(
+            url,
+            json=payload,
+            headers={"Idempotency-Key": f"{provider_id}:{h}"},
+            timeout=REQUEST_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        return provider_id, h, str(e)
+
+    if response.status_code not in (200, 201):
+        return provider_id, h, f"HTTP {response.status_code}: {response.text[:200]}"
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+
+    if isinstance(body, dict) and body.get("status") is False:
+        return provider_id, h, f"Rejected: {json.dumps(body)[:200]}"
+
+    return provider_id, h, None
+
+
+def drain(
+    outbox: Outbox,
+    url: str,
+    workers: int = PUSH_WORKERS,
+    rate_per_sec: float = PUSH_RATE_PER_SEC,
+    session: requests.Session = None,
+) -> Dict:
+    """
+    Push every pending row that is due with `workers` concurrent
+    requests, capped at `rate_per_sec` requests per second overall.
+    Failed rows wait out their backoff for a later drain. Status
+    updates happen on this thread; workers only do HTTP.
+    """
+
+    session = session or create_push_session(workers)
+    limiter = RateLimiter(rate_per_sec)
+
+    sent = 0
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+
+        while True:
+            free = workers * 2 - len(in_flight)
+            if free > 0:
+                for provider_id, h, payload in outbox.claim(free):
+                    in_flight.add(executor.submit(_post, session, limiter, url, provider_id, h, payload))
+
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider_id, h, error = future.result()
+
+                if error is None:
+                    outbox.mark_sent(provider_id, h)
+                    sent += 1
+                else:
+                    outbox.mark_failed(provider_id, h, error)
+                    failed += 1
+                    print(f"❌ {provider_id}: {error}")
+
+    return {"pushed": sent, "failed_attempts": failed, **outbox.stats()}
@@ -1,13 +1,22 @@
 # app/integration/storage.py
 
+import gzip
 import json
 import os
-from typing import List, Dict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 DATA_DIR = "data"
 os.makedirs(DATA_DIR, exist_ok=True)
 
+JSONL_SUFFIXES = (".jsonl", ".jsonl.gz")
+
 
 def save_json(filename: str, data):
     path = os.path.join(DATA_DIR, filename)
@@ -21,3 +30,125 @@ def load_json(filename: str):
         return []
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
+
+
+# --------------------------------------------------
+# JSON LINES
+# --------------------------------------------------
+
+def dumps_line(row) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(row) + b"\n"
+    return (json.dumps(row, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def loads_line(line):
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def data_path(filename) -> Path:
+    return Path(DATA_DIR) / filename
+
+
+def _base_name(name: str) -> str:
+    for suffix in JSONL_SUFFIXES + (".json",):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def find_data_file(filename) -> Optional[Path]:
+    """
+    Resolve `filename` to an existing file, accepting any of the
+    .json / .jsonl / .jsonl.gz variants of the same name. When several
+    exist, the most recently written one wins.
+    """
+
+    path = data_path(filename)
+    base = _base_name(path.name)
+
+    variants = [path] + [path.with_name(base + s) for s in JSONL_SUFFIXES + (".json",)]
+    existing = [p for p in dict.fromkeys(variants) if p.exists()]
+
+    if not existing:
+        return None
+
+    return max(existing, key=lambda p: p.stat().st_mtime)
+
+
+def iter_rows(filename, exact: bool = False) -> Iterator[Dict]:
+    """
+    Yield rows one by one from a JSON Lines file (optionally gzipped),
+    or from a legacy JSON list file. With `exact`, only `filename`
+    itself is read, never another variant of it.
+    """
+
+    if exact:
+        path = data_path(filename)
+        if not path.exists():
+            return
+    else:
+        path = find_data_file(filename)
+        if path is None:
+            return
+
+    if path.name.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    opener = gzip.open if path.name.endswith(".gz") else open
+
+    with opener(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads_line(line)
+
+
+class JsonlWriter:
+    """
+    Append-only JSON Lines writer. Rows are flushed as they are
+    written (every `flush_every` rows), so readers and crash recovery
+    see output as it is produced. Filenames ending in .gz are gzipped.
+    """
+
+    def __init__(self, filename, append: bool = False, flush_every: int = 1):
+        self.path = data_path(filename)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        mode = "ab" if append else "wb"
+        self.file = gzip.open(self.path, mode) if self.path.name.endswith(".gz") else open(self.path, mode)
+
+        self.flush_every = flush_every
+        self.count = 0
+
+    def write(self, row):
+        self.file.write(dumps_line(row))
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.file.flush()
+
+    def write_many(self, rows: Iterable):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_jsonl(filename, rows: Iterable) -> int:
+    with JsonlWriter(filename) as writer:
+        writer.write_many(rows)
+        return writer.count
+
+
+def load_rows(filename) -> List[Dict]:
+    return list(iter_rows(filename))
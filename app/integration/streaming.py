@@ -0,0 +1,176 @@
+# app/integration/streaming.py
+
+import asyncio
+import queue
+import threading
+from typing import Dict, Iterator, Optional
+
+import aiohttp
+
+from config import (
+    BET365_URL,
+    KICKOFF_WINDOW_MIN,
+    ODDSPORTAL_URL,
+    REQUEST_TIMEOUT,
+    STREAM_BATCH_SIZE,
+    STREAM_QUEUE_PAGES,
+)
+from app.integration.async_fetcher import PageFetcher
+from app.integration.fetcher import HEADERS
+from app.inference.adapters import adapt_bet365_match, adapt_oddsportal_match
+from app.inference.engine import candidate_pairs, extend_pool, run_engine_batch
+
+BET365 = "bet365"
+ODDSPORTAL = "oddsportal"
+
+_DONE = object()
+
+
+def stream_pages(urls: Dict[str, str], max_pages: Optional[int] = None) -> Iterator:
+    """
+    Yields (feed name, rows) as pages arrive, from a fetch loop running
+    in a background thread. The queue is bounded, so fetching pauses
+    while the consumer is busy instead of buffering the whole feed.
+    Each feed's pages arrive in page order; feeds are interleaved.
+    """
+
+    pages = queue.Queue(maxsize=STREAM_QUEUE_PAGES)
+
+    async def produce(fetcher, name, url):
+        async for rows in fetcher.iter_pages(url, max_pages=max_pages):
+            await asyncio.to_thread(pages.put, (name, rows))
+
+    async def fetch_all():
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+            fetcher = PageFetcher(session)
+            await asyncio.gather(*[
+                produce(fetcher, name, url)
+                for name, url in urls.items()
+            ])
+
+    def run():
+        try:
+            asyncio.run(fetch_all())
+            pages.put(_DONE)
+        except Exception as e:
+            pages.put(e)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    while True:
+        item = pages.get()
+        if item is _DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+class KickoffWatermark:
+    """
+    Tracks how far the Bet365 feed has got in kickoff time.
+
+    The feed is expected to come in ascending kickoff order; while it
+    does, every later row kicks off at or after the last page's latest
+    kickoff. The first page that breaks the order switches early
+    release off, and OP matches wait for the end of the feed.
+    """
+
+    def __init__(self):
+        self.value = None
+        self.sorted = True
+        self.done = False
+
+    def update(self, b365_rows):
+        times = [int(m["commence_time"]) for m in b365_rows if m.get("commence_time") is not None]
+        if not times:
+            return
+
+        if self.value is not None and min(times) < self.value:
+            if self.sorted:
+                print("⚠ Bet365 feed is not in kickoff order; holding OP matches until it ends.")
+            self.sorted = False
+
+        self.value = max(times) if self.value is None else max(self.value, max(times))
+
+    def covers(self, op_match) -> bool:
+        if self.done:
+            return True
+        if not self.sorted or self.value is None:
+            return False
+        if op_match.get("commence_time") is None:
+            # Global retrieval needs the whole pool
+            return False
+        return int(op_match["commence_time"]) + KICKOFF_WINDOW_MIN * 60 < self.value
+
+
+def _adapt_page(rows, adapt):
+    adapted = []
+    for raw in rows:
+        try:
+            adapted.append(adapt(raw))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            print(f"⚠ Skipping match {raw.get('id')}: {e}")
+    return adapted
+
+
+def stream_mapping(
+    urls: Optional[Dict[str, str]] = None,
+    max_pages: Optional[int] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+    skip_mapped: bool = True,
+) -> Iterator:
+    """
+    Fetch, adapt and infer as one stream.
+
+    Bet365 pages are adapted and added to the engine's pool as they
+    arrive. OP matches wait until the Bet365 data loaded so far covers
+    their kickoff window, then go through run_engine_batch in batches
+    of `batch_size`. Yields (op_match, candidates, decision).
+    """
+
+    urls = urls or {BET365: BET365_URL, ODDSPORTAL: ODDSPORTAL_URL}
+
+    pool = []
+    pending = []
+    ready = []
+    watermark = KickoffWatermark()
+
+    def run_batch(batch):
+        pairs = candidate_pairs(batch) if pool else None
+        results = run_engine_batch(batch, pool, pairs=pairs)
+        return zip(batch, results)
+
+    def release():
+        still_pending = []
+        for op in pending:
+            (ready if watermark.covers(op) else still_pending).append(op)
+        pending[:] = still_pending
+
+    for name, rows in stream_pages(urls, max_pages=max_pages):
+
+        if name == BET365:
+            matches = _adapt_page(rows, adapt_bet365_match)
+            if matches:
+                extend_pool(pool, matches)
+                watermark.update(matches)
+
+        else:
+            if skip_mapped:
+                rows = [m for m in rows if not m.get("isMapped")]
+            pending.extend(_adapt_page(rows, adapt_oddsportal_match))
+
+        release()
+
+        while len(ready) >= batch_size:
+            batch, ready[:] = ready[:batch_size], ready[batch_size:]
+            for op, (candidates, decision) in run_batch(batch):
+                yield op, candidates, decision
+
+    watermark.done = True
+    release()
+
+    for start in range(0, len(ready), batch_size):
+        for op, (candidates, decision) in run_batch(ready[start:start + batch_size]):
+            yield op, candidates, decision
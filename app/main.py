@@ -1,22 +1,75 @@
 # app/main.py
 
-from fastapi import FastAPI
+import hashlib
+import json
+import threading
+
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Dict, List
 
-from app.inference.pipeline import run_inference
+from app.inference.engine import get_aliases, run_engine
+from app.inference.registry import registry
 
 app = FastAPI(title="AI Match Mapping Engine")
 
+# run_engine indexes the request's pool into shared model state
+engine_lock = threading.Lock()
+
+# Last indexed pool by content hash: requests sending the same Bet365
+# matches reuse it, since run_engine only skips indexing for the very
+# list object it indexed
+indexed_pool = {"key": None, "matches": None}
+
+
+def pool_for(b365_matches: List[Dict]) -> List[Dict]:
+    key = hashlib.sha1(json.dumps(b365_matches, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    if key != indexed_pool["key"]:
+        indexed_pool["key"] = key
+        indexed_pool["matches"] = b365_matches
+
+    return indexed_pool["matches"]
+
 
 class InferRequest(BaseModel):
     op_match: Dict
     b365_matches: List[Dict]
 
 
+@app.on_event("startup")
+def start_warmup():
+    # Warm up in the background so the process starts serving
+    # /health immediately during rolling restarts.
+    threading.Thread(target=registry.warmup, daemon=True).start()
+
+    # Compile the team-alias lookup before the first request; /infer
+    # reloads it whenever the store file changes
+    get_aliases()
+
+
+@app.get("/health")
+def health():
+    return registry.status()
+
+
 @app.post("/infer")
 def infer_match(req: InferRequest):
-    return run_inference(
-        op_match=req.op_match,
-        b365_matches=req.b365_matches,
-    )
+    if registry.state != "ready":
+        raise HTTPException(status_code=503, detail=registry.status())
+
+    with engine_lock:
+        # Picks up aliases the cron cycle learned since the last request
+        store = get_aliases()
+        if store is not None:
+            store.refresh()
+
+        candidates, decision = run_engine(
+            op_match=req.op_match,
+            bet365_matches=pool_for(req.b365_matches),
+        )
+
+    return {
+        "candidates": candidates or [],
+        "decision": decision,
+    }
@@ -4,6 +4,98 @@ ODDSPORTAL_URL = "https://sports-bet-api.allinsports.online/api/matches/get-odds
 DEFAULT_LIMIT = 50
 REQUEST_TIMEOUT = 30
 
+FETCH_CONCURRENCY_PER_HOST = 4
+FETCH_RETRIES = 5
+
+# Streaming pipeline: OP matches per inference batch, pages buffered
+STREAM_BATCH_SIZE = 256
+STREAM_QUEUE_PAGES = 8
+
 KICKOFF_WINDOW_MIN = 30
 MIN_SCORE = 0.90
-MIN_MARGIN = 0.10
\ No newline at end of file
+MIN_MARGIN = 0.10
+
+SBERT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+CROSS_ENCODER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+EMBEDDING_STORE_DIR = "data/embeddings"
+USE_EMBEDDING_STORE = True
+
+USE_PAIR_CACHE = True
+PAIR_CACHE_FILE = "data/pair_score_cache.json"
+PAIR_CACHE_MAX_ENTRIES = 200000
+PAIR_CACHE_TTL_SEC = 7 * 24 * 3600
+
+RERANK_BATCH_SIZE = 256
+
+# "torch" or "onnx-int8" (needs onnxruntime; models are exported on first use)
+INFERENCE_BACKEND = "torch"
+ONNX_MODEL_DIR = "data/onnx"
+
+WARMUP_SEQ_LENGTHS = (8, 32, 128)
+
+DECISION_CACHE_FILE = "data/decision_cache.json"
+
+# One outbox per endpoint: rows are keyed by provider_id only, so a
+# row sent to one endpoint would count as sent for the other
+OUTBOX_DB = "data/push_outbox.sqlite3"
+OUTBOX_DB_V2 = "data/push_outbox_v2.sqlite3"
+PUSH_WORKERS = 4
+PUSH_RATE_PER_SEC = 5.0
+PUSH_MAX_ATTEMPTS = 5
+FEEDBACK_LOG_FILE = "data/feedback_log.jsonl"
+FEEDBACK_FSYNC_EVERY = 64
+FEEDBACK_FSYNC_INTERVAL_SEC = 1.0
+# Compact once the log holds this many times more lines than providers
+FEEDBACK_COMPACT_RATIO = 2.0
+FEEDBACK_COMPACT_MIN_ENTRIES = 10000
+
+# Hard negatives mined per labeled OP match
+HARD_NEGATIVES_K = 5
+
+# Distilled reranker (scripts/distill_reranker.py). Set
+# CROSS_ENCODER_MODEL_NAME to STUDENT_MODEL_DIR to serve it.
+STUDENT_MODEL_DIR = "data/models/cross-encoder-student"
+# Teacher layers copied into the student
+STUDENT_LAYERS = (0, 2, 5)
+DISTILL_REPORT_FILE = "data/distillation_report.json"
+
+# Exact-key fast path: same sport, same normalized teams (either
+# orientation) and kickoffs this close resolve without the models
+USE_EXACT_JOIN = True
+EXACT_KICKOFF_TOLERANCE_MIN = 5
+# Reranker-scale score given to exact hits (sigmoid ~ 0.99995, so
+# confidence rounds to 1.0); output rows flag them with "exact_match"
+EXACT_MATCH_SCORE = 10.0
+
+# OP -> Bet365 team names learned from confirmed mappings
+USE_TEAM_ALIASES = True
+TEAM_ALIASES_FILE = "data/team_aliases.json"
+# An alias feeds the exact join, which skips the cross-encoder, so it
+# needs this many net confirmations and this lead over the runner-up
+ALIAS_MIN_VOTES = 2
+ALIAS_MIN_MARGIN = 1
+
+# Lexical blocking ahead of SBERT: character n-gram MinHash LSH over
+# team names, applied to kickoff windows with at least
+# LEXICAL_MIN_POOL candidates
+USE_LEXICAL_BLOCKING = True
+LEXICAL_MIN_POOL = 32
+LEXICAL_NGRAM = 3
+LEXICAL_BANDS = 16
+LEXICAL_ROWS = 2
+
+# Global retrieval fallback for OP matches the kickoff prefilter
+# cannot place (kickoff missing or outside every window): IVF ANN
+# over the Bet365 embeddings, per sport
+USE_ANN_FALLBACK = True
+ANN_NPROBE = 8
+ANN_OVERFETCH = 50
+# Subtracted from the cosine score before the top 10 are reranked
+ANN_TIME_PENALTY_PER_HOUR = 0.02
+ANN_MISSING_KICKOFF_PENALTY = 0.05
+
+# One-to-one assignment in batch mapping: min-cost matching per
+# connected component of the OP x Bet365 score graph; components with
+# more OP matches than this are solved in kickoff-ordered blocks
+ASSIGN_MAX_BLOCK = 500
@@ -0,0 +1,98 @@
+# scripts/check_blocking_recall.py
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from config import LEXICAL_BANDS, LEXICAL_MIN_POOL, LEXICAL_NGRAM, LEXICAL_ROWS
+from app.feedback.dataset_builder import DATASET_FILE
+from app.inference.lexical_blocking import LexicalIndex, blocking_recall
+from app.inference.prefilter import sweep_join
+from app.integration.storage import iter_rows
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+
+DATA_DIR = Path("data")
+
+BET365_FILE = DATA_DIR / "bet365_full_dump.json"
+OP_FILE = DATA_DIR / "op_full_dump.json"
+REPORT_FILE = DATA_DIR / "blocking_report.json"
+
+
+# --------------------------------------------------
+# NORMALIZATION
+# --------------------------------------------------
+
+def normalize_match(raw):
+
+    return {
+        "id": raw.get("id"),
+        "sport": (raw.get("sport") or "").lower(),
+        "home_team": raw.get("home_team"),
+        "away_team": raw.get("away_team"),
+        "commence_time": raw.get("commence_time"),
+    }
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--min-pool", type=int, default=LEXICAL_MIN_POOL)
+    parser.add_argument("--ngram", type=int, default=LEXICAL_NGRAM)
+    parser.add_argument("--bands", type=int, default=LEXICAL_BANDS)
+    parser.add_argument("--rows", type=int, default=LEXICAL_ROWS)
+    args = parser.parse_args()
+
+    if not BET365_FILE.exists() or not OP_FILE.exists():
+        print("❌ Full dump files not found. Run fetch_all_data first.")
+        return
+
+    with open(BET365_FILE, "r", encoding="utf-8") as f:
+        bet365 = [normalize_match(m) for m in json.load(f) if m.get("commence_time")]
+
+    # Mapped OP matches are kept: they are the ones with labels
+    with open(OP_FILE, "r", encoding="utf-8") as f:
+        op_matches = [normalize_match(m) for m in json.load(f) if m.get("commence_time")]
+
+    positives = {}
+    for row in iter_rows(DATASET_FILE, exact=True):
+        if row.get("label") == 1:
+            positives.setdefault(str(row["op_id"]), set()).add(str(row["b365_id"]))
+
+    start = time.perf_counter()
+    index = LexicalIndex(bet365, ngram=args.ngram, bands=args.bands, rows=args.rows, min_pool=args.min_pool)
+    index_seconds = time.perf_counter() - start
+
+    full = sweep_join(op_matches, bet365)
+
+    start = time.perf_counter()
+    blocked, stats = index.filter_pairs(op_matches, full)
+    block_seconds = time.perf_counter() - start
+
+    report = {
+        "settings": vars(args),
+        "op_matches": len(op_matches),
+        "bet365_matches": len(bet365),
+        **stats,
+        "pair_reduction_pct": round(100 * (1 - stats["pairs_out"] / stats["pairs_in"]), 2) if stats["pairs_in"] else 0.0,
+        **blocking_recall(op_matches, full, blocked, positives, bet365),
+        "index_seconds": round(index_seconds, 3),
+        "blocking_seconds": round(block_seconds, 3),
+    }
+
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    print(f"✅ Report saved to: {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# scripts/check_onnx_parity.py
+
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.inference.backends import (
+    ONNX_INT8,
+    TORCH,
+    load_cross_encoder,
+    load_sentence_encoder,
+)
+from app.inference.gates import apply_gates
+from app.inference.prefilter import PrefilterIndex
+from app.inference.reranker import MODEL_NAME as CROSS_ENCODER_NAME
+from app.inference.sbert_index import MODEL_NAME as SBERT_NAME
+from app.inference.text_builder import build_text
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+
+DATA_DIR = Path("data")
+
+BET365_FILE = DATA_DIR / "bet365_full_dump.json"
+OP_FILE = DATA_DIR / "op_full_dump.json"
+REPORT_FILE = DATA_DIR / "onnx_parity_report.json"
+
+SAMPLE_SIZE = 300
+SEED = 42
+
+
+# --------------------------------------------------
+# NORMALIZATION
+# --------------------------------------------------
+
+def normalize_match(raw):
+
+    return {
+        "id": raw.get("id"),
+        "sport": (raw.get("sport") or "").lower(),
+        "league": raw.get("league", {}).get("league_name_en") if isinstance(raw.get("league"), dict) else "",
+        "home_team": raw.get("home_team"),
+        "away_team": raw.get("away_team"),
+        "commence_time": raw.get("commence_time"),
+    }
+
+
+# --------------------------------------------------
+# SCORING
+# --------------------------------------------------
+
+def rerank(model, op_text, candidates, timings, name):
+    pairs = [(op_text, c["text"]) for c in candidates]
+
+    start = time.perf_counter()
+    scores = model.predict(pairs)
+    timings[name] += time.perf_counter() - start
+
+    scored = [dict(c, final_score=float(s)) for c, s in zip(candidates, scores)]
+    return sorted(scored, key=lambda x: x["final_score"], reverse=True)[:5], np.asarray(scores, dtype=np.float64)
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+
+def main():
+
+    if not BET365_FILE.exists() or not OP_FILE.exists():
+        print("❌ Full dump files not found. Run fetch_all_data first.")
+        return
+
+    with open(BET365_FILE, "r", encoding="utf-8") as f:
+        bet365 = [normalize_match(m) for m in json.load(f) if m.get("commence_time")]
+
+    with open(OP_FILE, "r", encoding="utf-8") as f:
+        op_matches = [normalize_match(m) for m in json.load(f) if m.get("commence_time")]
+
+    random.seed(SEED)
+    sample = random.sample(op_matches, min(SAMPLE_SIZE, len(op_matches)))
+
+    for m in bet365:
+        m["text"] = build_text(m)
+
+    index = PrefilterIndex(bet365)
+
+    print("Loading PyTorch models...")
+    torch_sbert = load_sentence_encoder(SBERT_NAME, backend=TORCH)
+    torch_ce = load_cross_encoder(CROSS_ENCODER_NAME, backend=TORCH)
+
+    print("Loading ONNX int8 models...")
+    onnx_sbert = load_sentence_encoder(SBERT_NAME, backend=ONNX_INT8)
+    onnx_ce = load_cross_encoder(CROSS_ENCODER_NAME, backend=ONNX_INT8)
+
+    timings = {"sbert_torch": 0.0, "sbert_onnx": 0.0, "ce_torch": 0.0, "ce_onnx": 0.0}
+    embedding_drift = []
+    score_drift = []
+
+    compared = 0
+    decision_changes = 0
+    top1_changes = 0
+
+    for op in sample:
+
+        rows, _ = index.query(op)
+        if not rows:
+            continue
+
+        op_text = build_text(op)
+        texts = [op_text] + [bet365[r]["text"] for r in rows]
+
+        start = time.perf_counter()
+        torch_emb = torch_sbert.encode(texts, normalize_embeddings=True)
+        timings["sbert_torch"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        onnx_emb = onnx_sbert.encode(texts, normalize_embeddings=True)
+        timings["sbert_onnx"] += time.perf_counter() - start
+
+        embedding_drift.extend(1 - np.sum(torch_emb * onnx_emb, axis=1))
+
+        # Same retrieved candidates for both cross-encoders, so only
+        # the reranking stage is compared.
+        sims = torch_emb[1:] @ torch_emb[0]
+        top = np.argsort(-sims)[:10]
+        candidates = [bet365[rows[i]] for i in top]
+
+        torch_top, torch_scores = rerank(torch_ce, op_text, candidates, timings, "ce_torch")
+        onnx_top, onnx_scores = rerank(onnx_ce, op_text, candidates, timings, "ce_onnx")
+
+        score_drift.extend(np.abs(torch_scores - onnx_scores))
+
+        compared += 1
+        if apply_gates(torch_top) != apply_gates(onnx_top):
+            decision_changes += 1
+        if torch_top[0]["id"] != onnx_top[0]["id"]:
+            top1_changes += 1
+
+    if not compared:
+        print("Nothing to compare: no sampled OP match had candidates.")
+        return
+
+    report = {
+        "compared_matches": compared,
+        "gate_decision_changes": decision_changes,
+        "top1_changes": top1_changes,
+        "embedding_cosine_drift_mean": float(np.mean(embedding_drift)),
+        "embedding_cosine_drift_max": float(np.max(embedding_drift)),
+        "score_abs_drift_mean": float(np.mean(score_drift)),
+        "score_abs_drift_max": float(np.max(score_drift)),
+        "seconds": {k: round(v, 3) for k, v in timings.items()},
+    }
+
+    print("\n----------------------------------")
+    print(json.dumps(report, indent=2))
+
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"✅ Parity report saved to: {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# scripts/distill_reranker.py
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+from config import CROSS_ENCODER_MODEL_NAME, DISTILL_REPORT_FILE, STUDENT_LAYERS, STUDENT_MODEL_DIR
+from app.feedback.distillation import collect_pairs, distill, evaluate, make_student, teacher_logits
+from app.inference.engine import retrieve_batch
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+
+DATA_DIR = Path("data")
+
+BET365_FILE = DATA_DIR / "bet365_full_dump.json"
+OP_FILE = DATA_DIR / "op_full_dump.json"
+
+
+# --------------------------------------------------
+# NORMALIZATION
+# --------------------------------------------------
+
+def normalize_match(raw):
+
+    return {
+        "id": raw.get("id"),
+        "sport": (raw.get("sport") or "").lower(),
+        "league": raw.get("league", {}).get("league_name_en") if isinstance(raw.get("league"), dict) else "",
+        "home_team": raw.get("home_team"),
+        "away_team": raw.get("away_team"),
+        "kickoff_utc": raw.get("commence_time"),
+        "commence_time": raw.get("commence_time"),
+        "categories": [],
+    }
+
+
+def in_holdout(match, holdout_pct):
+    # Stable across runs, so the evaluation set never leaks into training
+    digest = hashlib.sha1(str(match.get("id")).encode("utf-8")).digest()
+    return digest[0] * 100 < holdout_pct * 256
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--teacher", default=CROSS_ENCODER_MODEL_NAME)
+    parser.add_argument("--student", default=STUDENT_MODEL_DIR)
+    parser.add_argument("--layers", type=int, nargs="+", default=list(STUDENT_LAYERS), help="teacher layers to keep")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--holdout", type=float, default=10.0, help="percent of OP matches kept for evaluation")
+    parser.add_argument("--eval-only", action="store_true", help="skip training and only write the report")
+    args = parser.parse_args()
+
+    if not BET365_FILE.exists() or not OP_FILE.exists():
+        print("❌ Full dump files not found. Run fetch_all_data first.")
+        return
+
+    # The prefilter needs a kickoff on both sides
+    with open(BET365_FILE, "r", encoding="utf-8") as f:
+        bet365 = [normalize_match(m) for m in json.load(f) if m.get("commence_time")]
+
+    with open(OP_FILE, "r", encoding="utf-8") as f:
+        op_matches = [normalize_match(m) for m in json.load(f) if m.get("commence_time")]
+
+    train_ops = [m for m in op_matches if not in_holdout(m, args.holdout)]
+    eval_ops = [m for m in op_matches if in_holdout(m, args.holdout)]
+
+    print(f"Bet365 corpus: {len(bet365)} | OP matches: {len(train_ops)} train, {len(eval_ops)} holdout")
+
+    if not args.eval_only:
+
+        pairs = collect_pairs(train_ops, bet365)
+        print(f"Distillation pairs: {len(pairs)}")
+
+        print(f"Scoring pairs with teacher {args.teacher}...")
+        logits = teacher_logits(pairs, teacher=args.teacher)
+
+        make_student(args.teacher, args.layers, args.student)
+        print(f"Training {len(args.layers)}-layer student in {args.student}...")
+        distill(pairs, logits, out_dir=args.student, epochs=args.epochs)
+
+    report = evaluate(retrieve_batch(eval_ops, bet365), teacher=args.teacher, student=args.student)
+    report["student_layers"] = args.layers
+
+    with open(DISTILL_REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    print(f"✅ Report saved to: {DISTILL_REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
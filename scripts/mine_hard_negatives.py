@@ -0,0 +1,83 @@
+# scripts/mine_hard_negatives.py
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from config import HARD_NEGATIVES_K
+from app.feedback.dataset_builder import DATASET_FILE
+from app.feedback.hard_negatives import labeled_positives, mine_hard_negatives, write_hard_negatives
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+
+DATA_DIR = Path("data")
+
+BET365_FILE = DATA_DIR / "bet365_full_dump.json"
+OP_FILE = DATA_DIR / "op_full_dump.json"
+
+
+# --------------------------------------------------
+# NORMALIZATION
+# --------------------------------------------------
+
+def normalize_match(raw):
+
+    return {
+        "id": raw.get("id"),
+        "sport": (raw.get("sport") or "").lower(),
+        "league": raw.get("league", {}).get("league_name_en") if isinstance(raw.get("league"), dict) else "",
+        "home_team": raw.get("home_team"),
+        "away_team": raw.get("away_team"),
+        "commence_time": raw.get("commence_time"),
+    }
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=HARD_NEGATIVES_K, help="negatives per labeled OP match")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if not BET365_FILE.exists() or not OP_FILE.exists():
+        print("❌ Full dump files not found. Run fetch_all_data first.")
+        return
+
+    positives = labeled_positives()
+    print(f"Labeled OP matches in {DATASET_FILE}: {len(positives)}")
+
+    if not positives:
+        print("⚠ Nothing to mine for.")
+        return
+
+    with open(BET365_FILE, "r", encoding="utf-8") as f:
+        bet365 = [normalize_match(m) for m in json.load(f)]
+
+    # Unlike inference, mapped OP matches are kept: they carry the labels
+    with open(OP_FILE, "r", encoding="utf-8") as f:
+        op_matches = [normalize_match(m) for m in json.load(f)]
+
+    print(f"Bet365 corpus: {len(bet365)} | OP matches: {len(op_matches)}")
+
+    start = time.time()
+
+    mined = mine_hard_negatives(op_matches, positives, bet365, k=args.k, batch_size=args.batch_size)
+    mined_time = time.time() - start
+
+    kept, added = write_hard_negatives(mined)
+
+    print("\n----------------------------------")
+    print(f"OP matches mined: {len(mined)} ({len(positives) - len(mined)} not found in the OP dump)")
+    print(f"Mining took {mined_time:.1f}s")
+    print(f"Dataset: {kept} rows kept, {added} mined negatives added")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 # scripts/push_mapping_output.py
 
-import json
-import time
-import requests
-from pathlib import Path
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import argparse
+
+from config import PUSH_RATE_PER_SEC, PUSH_WORKERS
+from app.integration.outbox import Outbox, drain
+from app.integration.storage import find_data_file, iter_rows
 
 
 # --------------------------------------------------
@@ -13,37 +12,8 @@ from urllib3.util.retry import Retry
 # --------------------------------------------------
 
 POST_URL = "https://sports-bet-api.allinsports.online/api/matches/ai-mapping-suggestion-save"
-INPUT_FILE = Path("data/mapping_output.json")
-
-REQUEST_TIMEOUT = 30
-SLEEP_BETWEEN_REQUESTS = 0.3   # safe throttle
-
-HEADERS = {
-    "Content-Type": "application/json",
-    "User-Agent": "Mozilla/5.0",
-    "Accept": "application/json",
-}
-
-
-# --------------------------------------------------
-# CREATE SESSION WITH RETRIES
-# --------------------------------------------------
-
-def create_session():
-    session = requests.Session()
-
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["POST"],
-    )
-
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.headers.update(HEADERS)
-
-    return session
+# Any of mapping_output.json / .jsonl / .jsonl.gz; the newest wins
+INPUT_FILE = "mapping_output.json"
 
 
 # --------------------------------------------------
@@ -52,49 +22,36 @@ def create_session():
 
 def main():
 
-    if not INPUT_FILE.exists():
-        print("❌ mapping_output.json not found.")
-        return
-
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        mappings = json.load(f)
-
-    print(f"Loaded mappings: {len(mappings)}")
-
-    if not mappings:
-        print("Nothing to push.")
-        return
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=PUSH_WORKERS)
+    parser.add_argument("--rate", type=float, default=PUSH_RATE_PER_SEC, help="max requests per second")
+    parser.add_argument("--retry-failed", action="store_true", help="requeue rows that used up their attempts")
+    args = parser.parse_args()
 
-    session = create_session()
+    outbox = Outbox()
 
-    success = 0
-    failed = 0
+    path = find_data_file(INPUT_FILE)
 
-    for idx, row in enumerate(mappings, start=1):
+    if path is not None:
+        # Rows stream from disk straight into the outbox
+        counts = outbox.enqueue(iter_rows(path.name, exact=True))
 
-        try:
-            response = session.post(
-                POST_URL,
-                json=row,
-                timeout=REQUEST_TIMEOUT,
-            )
+        print(f"Loaded mappings from {path}: {counts['queued'] + counts['unchanged']}")
+        print(f"Queued: {counts['queued']} | Already pushed / queued unchanged: {counts['unchanged']}")
 
-            if response.status_code in (200, 201):
-                success += 1
-                print(f"[{idx}] ✅ Success → provider_id: {row.get('provider_id')}")
-            else:
-                failed += 1
-                print(f"[{idx}] ❌ Failed ({response.status_code}) → {response.text}")
+    else:
+        print("⚠ mapping_output not found; resuming the outbox only.")
 
-        except Exception as e:
-            failed += 1
-            print(f"[{idx}] ❌ Error → {e}")
+    if args.retry_failed:
+        print(f"Requeued failed rows: {outbox.retry_failed()}")
 
-        time.sleep(SLEEP_BETWEEN_REQUESTS)
+    summary = drain(outbox, POST_URL, workers=args.workers, rate_per_sec=args.rate)
+    outbox.close()
 
     print("\n----------------------------------")
-    print(f"Total Success: {success}")
-    print(f"Total Failed : {failed}")
+    print(f"Total Success: {summary['pushed']}")
+    print(f"Total Failed : {summary['failed_attempts']}")
+    print(f"Outbox: {summary['pending']} pending, {summary['sent']} sent, {summary['failed']} failed")
     print("✅ Push process completed.")
 
 
@@ -1,10 +1,9 @@
-import json
-import requests
 import sched
 import time
-from pathlib import Path
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from config import OUTBOX_DB_V2
+from app.integration.outbox import Outbox, create_push_session, drain
+from app.integration.storage import find_data_file, iter_rows
 
 # ---------------------------------
 # CONFIG
@@ -12,19 +11,15 @@ from urllib3.util.retry import Retry
 
 POST_URL = "https://sports-bet-api.allinsports.online/api/matches/ai-mapping-suggestion-save_v2"
 
-MAPPING_FILE = Path("data/mapping_output.json")
-STATE_FILE = Path("data/push_state.json")
-
-REQUEST_TIMEOUT = 30
+# Any of mapping_output.json / .jsonl / .jsonl.gz; the newest wins
+MAPPING_FILE = "mapping_output.json"
 
 # ⏱ Change here (5 mins = 300, 30 mins = 1800)
-INTERVAL_SECONDS = 300  
+INTERVAL_SECONDS = 300
 
-HEADERS = {
-    "Content-Type": "application/json",
-    "Accept": "application/json",
-    "User-Agent": "AI-Mapping-Engine/1.0"
-}
+# Pushes per second during each drain
+RATE_PER_SEC = 2.0
+WORKERS = 2
 
 # ---------------------------------
 # SCHEDULER
@@ -32,101 +27,38 @@ HEADERS = {
 
 scheduler = sched.scheduler(time.time, time.sleep)
 
-# ---------------------------------
-# SESSION WITH RETRY
-# ---------------------------------
-
-def create_session():
-    session = requests.Session()
-
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-    )
-
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.headers.update(HEADERS)
-
-    return session
-
-# ---------------------------------
-# STATE
-# ---------------------------------
-
-def load_state():
-    if not STATE_FILE.exists():
-        return {"last_pushed_index": -1}
-
-    with open(STATE_FILE, "r") as f:
-        return json.load(f)
-
-def save_state(index: int):
-    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(STATE_FILE, "w") as f:
-        json.dump({"last_pushed_index": index}, f)
+# One pooled session and one outbox for the life of the process
+session = create_push_session(WORKERS)
+# The _v2 endpoint has its own outbox; see OUTBOX_DB_V2
+outbox = Outbox(OUTBOX_DB_V2)
 
 # ---------------------------------
-# PUSH ONE MATCH
+# PUSH PENDING MATCHES
 # ---------------------------------
 
-def push_next_mapping():
-
-    if not MAPPING_FILE.exists():
-        print("❌ mapping_output.json not found.")
-        return
-
-    with open(MAPPING_FILE, "r", encoding="utf-8") as f:
-        mappings = json.load(f)
-
-    total = len(mappings)
-
-    if total == 0:
-        print("Nothing to push.")
-        return
-
-    state = load_state()
-    last_index = state.get("last_pushed_index", -1)
-    next_index = last_index + 1
-
-    if next_index >= total:
-        print("✅ All mappings pushed. Scheduler stopping.")
-        return
-
-    mapping = mappings[next_index]
-
-    print("\n----------------------------------")
-    print(f"Pushing index {next_index + 1} / {total}")
-    print(json.dumps(mapping, indent=2))
-    print("----------------------------------\n")
-
-    session = create_session()
+def push_pending_mappings():
 
     try:
-        response = session.post(
-            POST_URL,
-            json=mapping,
-            timeout=REQUEST_TIMEOUT
-        )
+        path = find_data_file(MAPPING_FILE)
 
-        print("Status Code:", response.status_code)
-        print("Response:", response.json())
+        if path is not None:
+            counts = outbox.enqueue(iter_rows(path.name, exact=True))
+            print(f"Queued {counts['queued']} new/changed rows ({counts['unchanged']} unchanged)")
 
-        if response.status_code == 200 and response.json().get("status"):
-            print("✅ Push successful.")
-            save_state(next_index)
+        else:
+            print("❌ mapping_output not found.")
 
-            # Schedule next push
-            scheduler.enter(INTERVAL_SECONDS, 1, push_next_mapping)
+        summary = drain(outbox, POST_URL, workers=WORKERS, rate_per_sec=RATE_PER_SEC, session=session)
 
-        else:
-            print("❌ Push failed. Will retry after interval.")
-            scheduler.enter(INTERVAL_SECONDS, 1, push_next_mapping)
+        print("\n----------------------------------")
+        print(f"Pushed: {summary['pushed']} | Failed attempts: {summary['failed_attempts']}")
+        print(f"Outbox: {summary['pending']} pending, {summary['failed']} failed")
+        print("----------------------------------\n")
 
     except Exception as e:
         print("❌ Error pushing:", e)
-        scheduler.enter(INTERVAL_SECONDS, 1, push_next_mapping)
+
+    scheduler.enter(INTERVAL_SECONDS, 1, push_pending_mappings)
 
 # ---------------------------------
 # MAIN
@@ -134,5 +66,5 @@ def push_next_mapping():
 
 if __name__ == "__main__":
     print("🚀 Starting Scheduled Push Engine")
-    scheduler.enter(0, 1, push_next_mapping)
+    scheduler.enter(0, 1, push_pending_mappings)
     scheduler.run()
@@ -1,37 +1,24 @@
 # scripts/run_feedback_loop.py
 
+import argparse
 import json
 from pathlib import Path
 from typing import Dict, List
 
+from app.feedback.dataset_builder import build_dataset_incremental
+from app.feedback.ingestion import get_feedback_log, ingest_feedback_export
+from app.integration.storage import find_data_file, load_rows
+
 # -----------------------------
 # FILE PATHS
 # -----------------------------
 
 ROOT = Path(__file__).resolve().parent.parent
 
-FEEDBACK_FILE = ROOT / "data" / "feedback.json"
-MAPPING_FILE = ROOT / "data" / "mapping_output.json"
+MAPPING_FILE = "mapping_output.json"
 OUT_FILE = ROOT / "data" / "training_dataset.json"
 
 
-# -----------------------------
-# LOAD JSON SAFELY
-# -----------------------------
-
-def load_json(path: Path):
-    if not path.exists():
-        print(f"❌ File not found: {path}")
-        return []
-
-    with open(path, "r", encoding="utf-8") as f:
-        try:
-            return json.load(f)
-        except Exception as e:
-            print(f"❌ Failed to parse JSON: {e}")
-            return []
-
-
 # -----------------------------
 # HARD NEGATIVE MINING BUILDER
 # -----------------------------
@@ -147,11 +134,28 @@ def build_training_dataset(feedback_list: List[Dict], mapping_list: List[Dict]):
 
 def main():
 
-    print("Reading feedback from:", FEEDBACK_FILE.resolve())
-    print("Reading mappings from:", MAPPING_FILE.resolve())
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="fold feedback logged since the last run into the on-disk dataset instead of rebuilding",
+    )
+    args = parser.parse_args()
+
+    if args.incremental:
+        build_dataset_incremental(mapping_file=MAPPING_FILE)
+        return
+
+    # Same source as --incremental: the feedback log, with the
+    # feedback export ingested into it first
+    log = get_feedback_log()
+    ingest_feedback_export(log=log)
+
+    print("Reading feedback from:", log.path.resolve())
+    print("Reading mappings from:", find_data_file(MAPPING_FILE))
 
-    feedback = load_json(FEEDBACK_FILE)
-    mappings = load_json(MAPPING_FILE)
+    feedback = list(log.latest())
+    mappings = load_rows(MAPPING_FILE)
 
     print(f"\nLoaded {len(feedback)} feedback entries.")
     print(f"Loaded {len(mappings)} mapping entries.\n")
@@ -2,7 +2,6 @@
 
 import math
 import json
-import traceback
 from pathlib import Path
 from typing import Dict, List
 from datetime import datetime, timezone
@@ -11,8 +10,9 @@ import sys
 ROOT = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT))
 
-from app.inference.pipeline import run_inference
-from app.inference.sbert import SBERTIndex
+from app.inference.assignment import assign_unique
+from app.inference.engine import flush_caches, index_pool, is_exact, run_engine_batch_isolated
+from app.inference.prefilter import sweep_join
 
 
 OP_FILE = Path("data/qsport-26-01-2026.oddsportal_matches.json")
@@ -21,6 +21,8 @@ OUT_FILE = Path("data/mapping_output.json")
 
 
 def unix_to_iso(ts: int) -> str:
+    if ts is None:
+        return None
     return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
 
 
@@ -41,6 +43,7 @@ def normalize_op_match(raw: Dict) -> Dict:
         "home_team": normalize_team_name(raw.get("home_team")),
         "away_team": normalize_team_name(raw.get("away_team")),
         "kickoff_utc": unix_to_iso(raw.get("commence_time")),
+        "commence_time": raw.get("commence_time"),
     }
 
 
@@ -52,6 +55,7 @@ def normalize_b365_match(raw: Dict) -> Dict:
         "home_team": normalize_team_name(raw.get("home_team")),
         "away_team": normalize_team_name(raw.get("away_team")),
         "kickoff_utc": unix_to_iso(raw.get("commence_time")),
+        "commence_time": raw.get("commence_time"),
     }
 
 
@@ -71,10 +75,12 @@ def format_output(
         confidence = round(sigmoid(raw_score), 4)
         bet365_id = best_candidate.get("id")
         switch_flag = best_candidate.get("swapped", False)
+        exact_match = best_candidate.get("exact_match", False)
     else:
         confidence = 0.0
         bet365_id = None
         switch_flag = False
+        exact_match = False
 
     return {
         "platform": "ODDSPORTAL",
@@ -85,6 +91,8 @@ def format_output(
         "is_mapped": True if decision == "AUTO_MATCH" else False,
         "reason": reason if reason else decision,
         "switch": switch_flag,
+        # Exact-key hits skip the models; their confidence is nominal
+        "exact_match": exact_match,
     }
 
 
@@ -104,55 +112,43 @@ def main():
     normalized_b365 = [normalize_b365_match(m) for m in b365_data]
 
     print("Building SBERT index...")
-    sbert_index = SBERTIndex()
-    sbert_index.build_or_load_embeddings(normalized_b365)
-
-    used_b365_ids = set()
-    output_rows = []
-
-    print("Running batch mapping...")
+    index_pool(normalized_b365)
 
+    normalized_op = []
     for idx, raw_op in enumerate(op_data):
-
         try:
+            normalized_op.append(normalize_op_match(raw_op))
+        except Exception as e:
+            print(f"Error normalizing match {idx}: {e}")
+            normalized_op.append(None)
 
-            op_match = normalize_op_match(raw_op)
-
-            result = run_inference(
-                op_match=op_match,
-                b365_matches=normalized_b365,
-            )
-
-            candidates = result.get("candidates", [])
-            decision = result.get("decision", "NO_MATCH")
-            reason = result.get("reason", decision)
+    valid_op = [m for m in normalized_op if m is not None]
 
-            # Fallback
-            if not candidates:
-                decision = "NO_MATCH"
-                reason = "no_match"
+    print("Joining candidate pairs...")
+    pairs = sweep_join(valid_op, normalized_b365)
+    print(f"Candidate pairs: {pairs.nnz}")
 
-            best_candidate = None
+    print("Running batch mapping...")
+    batch = run_engine_batch_isolated(valid_op, normalized_b365, pairs=pairs)
 
-            for c in candidates:
-                if c.get("id") not in used_b365_ids:
-                    best_candidate = c
-                    used_b365_ids.add(c.get("id"))
-                    break
+    # Each Bet365 match goes to at most one OP match, chosen globally
+    # over the reranked scores instead of first come, first served
+    print("Assigning Bet365 matches one-to-one...")
+    assigned = iter(assign_unique(valid_op, [candidates for candidates, _ in batch]))
+    batch = iter(batch)
 
-            formatted = format_output(
-                op_match,
-                best_candidate,
-                decision,
-                reason,
-            )
+    output_rows = []
+    exact_hits = 0
+    reassigned = 0
 
-        except Exception as e:
+    for raw_op, op_match in zip(op_data, normalized_op):
 
-            print(f"Error processing match {idx}: {e}")
-            traceback.print_exc()
+        if op_match is not None:
+            candidates, decision = next(batch)
+            best_candidate = next(assigned)
 
-            formatted = {
+        if op_match is None or decision == "ERROR":
+            output_rows.append({
                 "platform": "ODDSPORTAL",
                 "bet365_match": None,
                 "provider_id": raw_op.get("id"),
@@ -161,11 +157,41 @@ def main():
                 "is_mapped": False,
                 "reason": "processing_error",
                 "switch": False,
-            }
-
-        output_rows.append(formatted)
+                "exact_match": False,
+            })
+            continue
+
+        candidates = candidates or []
+        reason = decision
+        exact_hits += is_exact(candidates)
+
+        # Fallback
+        if not candidates:
+            decision = "NO_MATCH"
+            reason = "no_match"
+
+        elif best_candidate is None:
+            decision = "NO_MATCH"
+            reason = "assigned_elsewhere"
+
+        elif best_candidate is not candidates[0]:
+            # The gates only vouched for the top candidate
+            reassigned += 1
+            if decision == "AUTO_MATCH":
+                decision = reason = "NEED_REVIEW"
+
+        output_rows.append(format_output(
+            op_match,
+            best_candidate,
+            decision,
+            reason,
+        ))
+
+    flush_caches()
 
     print(f"\nGenerated {len(output_rows)} mappings.")
+    print(f"Moved off their top candidate by the assignment: {reassigned}")
+    print(f"Exact-key hits: {exact_hits}/{len(valid_op)} ({100 * exact_hits / max(len(valid_op), 1):.1f}%)")
 
     with open(OUT_FILE, "w", encoding="utf-8") as f:
         json.dump(output_rows, f, indent=2)
@@ -1,11 +1,20 @@
 # scripts/run_inference_on_full_dump.py
 
+import argparse
 import json
 import math
+import multiprocessing
+import os
 from pathlib import Path
 from collections import defaultdict
 
-from app.inference.pipeline import run_inference
+from config import CROSS_ENCODER_MODEL_NAME, KICKOFF_WINDOW_MIN, USE_PAIR_CACHE
+from app.inference.backends import backend_model_id
+from app.inference.engine import flush_caches, is_exact, run_engine_batch
+from app.inference.registry import registry
+from app.inference.score_cache import PairScoreCache
+from app.inference.text_builder import build_text
+from app.integration.storage import JsonlWriter
 
 # --------------------------------------------------
 # CONFIG
@@ -15,7 +24,11 @@ DATA_DIR = Path("data")
 
 BET365_FILE = DATA_DIR / "bet365_full_dump.json"
 OP_FILE = DATA_DIR / "op_full_dump.json"
-OUTPUT_FILE = DATA_DIR / "mapping_output.json"
+OUTPUT_FILE = "mapping_output.jsonl"
+
+# Parallel mode: sport shards with more OP matches than this are
+# split further by kickoff day (UTC).
+SHARD_MAX_OP = 2000
 
 
 # --------------------------------------------------
@@ -31,6 +44,7 @@ def normalize_match(raw):
         "home_team": raw.get("home_team"),
         "away_team": raw.get("away_team"),
         "kickoff_utc": raw.get("commence_time"),
+        "commence_time": raw.get("commence_time"),
         "categories": [],
     }
 
@@ -47,12 +61,201 @@ def group_by_sport(matches):
     return grouped
 
 
+# --------------------------------------------------
+# SHARD INFERENCE
+# --------------------------------------------------
+
+def map_shard(op_matches, bet365_matches):
+
+    results = []
+    auto_count = 0
+    exact_count = 0
+
+    batch = run_engine_batch(op_matches, bet365_matches)
+
+    for op_match, (candidates, decision) in zip(op_matches, batch):
+
+        if not candidates:
+            continue
+
+        exact_count += is_exact(candidates)
+
+        best = candidates[0]
+
+        if decision == "AUTO_MATCH":
+
+            prob = 1 / (1 + math.exp(-best.get("final_score", 0.0)))
+
+            results.append({
+                "platform": "ODDSPORTAL",
+                "bet365_match": best.get("id"),
+                "provider_id": op_match.get("id"),
+                "confidence": round(prob, 4),
+                "is_checked": False,
+                "is_mapped": True,
+                "reason": decision,
+                "switch": best.get("swapped", False),
+                # Exact-key hits skip the models; their confidence is nominal
+                "exact_match": best.get("exact_match", False),
+            })
+
+            auto_count += 1
+
+    return results, len(op_matches), auto_count, exact_count
+
+
+# --------------------------------------------------
+# PARALLEL MODE
+# --------------------------------------------------
+
+def build_shards(op_grouped, bet365_grouped):
+    """
+    One shard per sport, in sorted order. Big sports are split by
+    kickoff day; each day shard gets the Bet365 matches that can fall
+    inside the kickoff window of any of its OP matches.
+
+    The engine's global (ANN) fallback only searches the shard's pool,
+    so in a day shard an OP match whose window is empty is only looked
+    up among that day's fixtures, not the whole sport. OP matches
+    without a kickoff get a shard with the whole sport pool. Raise
+    SHARD_MAX_OP to give every OP match the full sport pool.
+    """
+
+    window = KICKOFF_WINDOW_MIN * 60
+    shards = []
+
+    for sport in sorted(op_grouped):
+
+        if sport not in bet365_grouped:
+            continue
+
+        ops = op_grouped[sport]
+        pool = bet365_grouped[sport]
+
+        if len(ops) <= SHARD_MAX_OP:
+            shards.append((sport, None, ops, pool))
+            continue
+
+        by_day = defaultdict(list)
+        no_kickoff = []
+        for m in ops:
+            if m.get("commence_time") is None:
+                no_kickoff.append(m)
+            else:
+                by_day[int(m["commence_time"]) // 86400].append(m)
+
+        # Kickoff-less Bet365 rows can only be found globally, so every
+        # day shard carries them
+        undated = [b for b in pool if b.get("commence_time") is None]
+
+        for day in sorted(by_day):
+            lo = day * 86400 - window
+            hi = (day + 1) * 86400 + window
+            day_pool = [b for b in pool if b.get("commence_time") is not None and lo <= int(b["commence_time"]) <= hi]
+            shards.append((sport, day, by_day[day], day_pool + undated))
+
+        # OP matches without a kickoff search the whole sport
+        if no_kickoff:
+            shards.append((sport, "no kickoff", no_kickoff, pool))
+
+    return shards
+
+
+def init_worker(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+    sbert = registry.sbert()
+    registry.reranker()
+
+    # The parent owns the on-disk store; workers must not append to it
+    if sbert.store is not None:
+        sbert.store.read_only = True
+
+
+def run_shard(shard):
+    """
+    map_shard's result plus the pair scores the worker's reranker
+    computed for this shard; workers never write the cache file
+    themselves, the parent merges and saves it once.
+    """
+
+    sport, day, op_matches, bet365_matches = shard
+    result = map_shard(op_matches, bet365_matches)
+
+    cache = registry.reranker().cache
+    return result, cache.take_new() if cache is not None else []
+
+
+def run_parallel(op_grouped, bet365_grouped, workers, writer):
+
+    shards = build_shards(op_grouped, bet365_grouped)
+    print(f"Shards: {len(shards)} on {workers} workers")
+
+    # Encode every text once here so workers only read the store
+    sbert = registry.sbert()
+    texts = sorted({
+        build_text(m)
+        for _, _, ops, pool in shards
+        for m in ops + pool
+    })
+    print(f"Pre-encoding {len(texts)} texts...")
+    sbert.encode(texts)
+
+    # Never fork: the encode above has started torch's OpenMP threads,
+    # and a forked child can hang on their locks. Spawned workers load
+    # the models themselves and read the embeddings from the store.
+    context = multiprocessing.get_context("spawn")
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    total_runs = 0
+    auto_count = 0
+    exact_count = 0
+
+    # The parent never loads the reranker, so flush_caches() has nothing
+    # to save here; worker scores are merged into this cache instead
+    pair_cache = PairScoreCache(backend_model_id(CROSS_ENCODER_MODEL_NAME)) if USE_PAIR_CACHE else None
+
+    with context.Pool(workers, initializer=init_worker, initargs=(threads,)) as pool:
+
+        # imap keeps shard order, so the output is deterministic; each
+        # shard is written as soon as it and the ones before it finish
+        shard_results = pool.imap(run_shard, shards, chunksize=1)
+
+        for (sport, day, ops, _), ((rows, runs, autos, exact), scores) in zip(shards, shard_results):
+            if day is None:
+                label = sport
+            elif isinstance(day, str):
+                label = f"{sport} ({day})"
+            else:
+                label = f"{sport} (day {day})"
+            print(f"{label}: {runs} OP matches, {autos} auto matches ({exact} exact)")
+            writer.write_many(rows)
+            total_runs += runs
+            auto_count += autos
+            exact_count += exact
+
+            if pair_cache is not None:
+                pair_cache.merge(scores)
+
+    if pair_cache is not None:
+        pair_cache.save()
+        print(f"Pair-score cache: {len(pair_cache)} entries saved")
+
+    return total_runs, auto_count, exact_count
+
+
 # --------------------------------------------------
 # MAIN
 # --------------------------------------------------
 
 def main():
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (1 = serial)")
+    args = parser.parse_args()
+
     if not BET365_FILE.exists() or not OP_FILE.exists():
         print("❌ Full dump files not found. Run fetch_all_data first.")
         return
@@ -66,66 +269,49 @@ def main():
     print(f"Loaded Bet365: {len(bet365_raw)}")
     print(f"Loaded OddsPortal: {len(op_raw)}")
 
+    # Rows without a kickoff go through the engine's global (ANN) retrieval
     bet365_norm = [normalize_match(m) for m in bet365_raw]
     op_norm = [normalize_match(m) for m in op_raw if not m.get("isMapped")]
 
     bet365_grouped = group_by_sport(bet365_norm)
     op_grouped = group_by_sport(op_norm)
 
-    results = []
-    total_runs = 0
-    auto_count = 0
-
-    for sport in op_grouped:
-
-        if sport not in bet365_grouped:
-            continue
+    writer = JsonlWriter(OUTPUT_FILE)
 
-        print("\n----------------------------------")
-        print(f"Running inference for sport: {sport}")
-        print(f"OP matches: {len(op_grouped[sport])}")
-        print(f"B365 matches: {len(bet365_grouped[sport])}")
+    if args.workers > 1:
+        total_runs, auto_count, exact_count = run_parallel(op_grouped, bet365_grouped, args.workers, writer)
 
-        for op_match in op_grouped[sport]:
+    else:
+        total_runs = 0
+        auto_count = 0
+        exact_count = 0
 
-            total_runs += 1
+        for sport in op_grouped:
 
-            result = run_inference(
-                op_match=op_match,
-                b365_matches=bet365_grouped[sport],
-            )
-
-            if not result.get("candidates"):
+            if sport not in bet365_grouped:
                 continue
 
-            best = result["candidates"][0]
-
-            if result["decision"] == "AUTO_MATCH":
+            print("\n----------------------------------")
+            print(f"Running inference for sport: {sport}")
+            print(f"OP matches: {len(op_grouped[sport])}")
+            print(f"B365 matches: {len(bet365_grouped[sport])}")
 
-                prob = 1 / (1 + math.exp(-best.get("final_score", 0.0)))
+            rows, runs, autos, exact = map_shard(op_grouped[sport], bet365_grouped[sport])
+            writer.write_many(rows)
+            total_runs += runs
+            auto_count += autos
+            exact_count += exact
 
-                results.append({
-                    "platform": "ODDSPORTAL",
-                    "bet365_match": best.get("id"),
-                    "provider_id": op_match.get("id"),
-                    "confidence": round(prob, 4),
-                    "is_checked": False,
-                    "is_mapped": True,
-                    "reason": result["reason"],
-                    "switch": best.get("swapped", False),
-                })
-
-                auto_count += 1
+    writer.close()
+    flush_caches()
 
     print("\n----------------------------------")
     print(f"Total inference runs: {total_runs}")
     print(f"AUTO MATCHES: {auto_count}")
+    print(f"Exact-key hits: {exact_count} ({100 * exact_count / max(total_runs, 1):.1f}% of runs)")
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2)
-
-    print("✅ Mapping output saved.")
-    print(f"Saved to: {OUTPUT_FILE}")
+    print(f"✅ Mapping output saved ({writer.count} rows).")
+    print(f"Saved to: {writer.path}")
 
 
 if __name__ == "__main__":
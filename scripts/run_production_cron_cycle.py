@@ -1,5 +1,7 @@
 # scripts/run_production_cron_cycle.py
 
+import argparse
+import os
 import requests
 import json
 import time
@@ -10,7 +12,18 @@ from datetime import datetime, timezone
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from app.inference.pipeline import run_inference
+from app.feedback.ingestion import get_feedback_log, ingest_feedback_export
+from app.inference.decision_cache import DecisionCache, fingerprint
+from app.inference.engine import (
+    candidate_pairs,
+    flush_caches,
+    get_aliases,
+    model_version,
+    rewrite_op,
+    run_engine_batch_isolated,
+    sync_pool,
+)
+from app.inference.registry import registry
 
 
 # --------------------------------------------------
@@ -21,11 +34,15 @@ BET365_URL = "https://sports-bet-api.allinsports.online/api/matches/get-bet365-m
 ODDSPORTAL_URL = "https://sports-bet-api.allinsports.online/api/matches/get-odds-portal-matches-with-odds/"
 
 OUT_FILE = Path("data/production_cron_output.json")
+LOCK_FILE = Path("data/production_cron.lock")
 
 MAX_PAGES_PER_RUN = 10
 REQUEST_TIMEOUT = 30
 SLEEP_BETWEEN_PAGES = 1.5
 
+# Daemon mode: seconds between cycle starts
+DAEMON_INTERVAL_SECONDS = 300
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
     "Accept": "application/json",
@@ -93,7 +110,7 @@ def fetch_limited_pages(session, base_url: str) -> List[Dict]:
             data = response.json()
 
             if not data.get("status"):
-                break
+                raise ValueError("response status is not OK")
 
             rows = data.get("data", {}).get("rows", [])
             total_pages = data.get("data", {}).get("totalPages", 1)
@@ -111,8 +128,10 @@ def fetch_limited_pages(session, base_url: str) -> List[Dict]:
             time.sleep(SLEEP_BETWEEN_PAGES)
 
         except Exception as e:
+            # A partial feed would retire the missing rows from the
+            # warm pool; fail the cycle instead
             print(f"Error fetching page {page}: {e}")
-            break
+            raise
 
     return all_rows
 
@@ -145,17 +164,77 @@ def normalize_match(raw: Dict) -> Dict:
         "home_team": raw.get("home_team") or raw.get("homeTeam"),
         "away_team": raw.get("away_team") or raw.get("awayTeam"),
         "kickoff_utc": unix_to_iso(raw.get("commence_time") or raw.get("startTime")),
+        "commence_time": raw.get("commence_time"),
         "categories": [],
     }
 
 
+def has_kickoff_field(raw: Dict) -> bool:
+    return raw.get("commence_time") is None or isinstance(raw.get("commence_time"), int)
+
+
 # --------------------------------------------------
-# MAIN CRON EXECUTION
+# CYCLE LOCK
 # --------------------------------------------------
 
-def main():
+class CycleLock:
+    """
+    Non-blocking exclusive lock on LOCK_FILE, so a cron-launched
+    cycle never overlaps a running daemon (or another cron tick).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.handle = None
+
+    def acquire(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handle = open(self.path, "a+")
+
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.handle.close()
+            self.handle = None
+            return False
+
+        return True
+
+    def release(self):
+        if self.handle is None:
+            return
+
+        if os.name == "nt":
+            import msvcrt
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+
+        self.handle.close()
+        self.handle = None
+
+
+# --------------------------------------------------
+# ONE CYCLE
+# --------------------------------------------------
 
-    session = create_session()
+def run_cycle(session, pool=None):
+    """
+    One fetch / infer / save cycle. `pool` is the indexed Bet365 pool
+    to bring up to date; the daemon passes the same list every cycle,
+    so only fixtures that changed are re-indexed.
+    """
+
+    if pool is None:
+        pool = []
 
     print("Fetching Bet365 matches (limited)...")
     bet365_raw = fetch_limited_pages(session, BET365_URL)
@@ -172,51 +251,117 @@ def main():
 
     print(f"Unmapped OP matches: {len(unmapped_op)}")
 
-    bet365_matches = [normalize_match(m) for m in bet365_raw]
-    op_matches = [normalize_match(m) for m in unmapped_op]
+    # Kickoffs must be unix times; rows without one only go through
+    # the engine's global (ANN) retrieval
+    bet365_matches = [normalize_match(m) for m in bet365_raw if has_kickoff_field(m)]
+    op_matches = [normalize_match(m) for m in unmapped_op if has_kickoff_field(m)]
+
+    if not bet365_matches:
+        # Most likely a failed fetch; syncing would empty the warm pool
+        print("⚠ No Bet365 matches fetched. Skipping this cycle.")
+        return []
+
+    added, retired = sync_pool(pool, bet365_matches)
+    print(f"Bet365 pool: {added} rows added, {retired} retired")
+
+    # Only OP matches whose inputs changed since the last cycle go
+    # through the models
+    feedback_log = get_feedback_log()
+
+    # Reviews arrive through the API's feedback export
+    ingested = ingest_feedback_export(log=feedback_log)
+    if ingested:
+        print(f"Feedback export: {ingested} new or changed reviews logged")
+
+    cache = DecisionCache(model_version())
+    invalidated = cache.apply_feedback(feedback_log)
+    if invalidated:
+        print(f"Feedback invalidated {invalidated} cached decisions")
+
+    # Confirmations point at OP matches that are mapped by now, so
+    # aliases learn from the whole OP feed, not just the unmapped part
+    aliases = get_aliases()
+    if aliases is not None:
+        learned = aliases.apply_feedback(
+            feedback_log,
+            [normalize_match(m) for m in op_raw],
+            bet365_matches,
+        )
+        aliases.save()
+        print(f"Team aliases: {len(aliases)} active, {learned} confirmations learned this cycle")
 
-    results = []
+    pairs = candidate_pairs(op_matches)
 
-    for op_match in op_matches:
+    decided = {}
+    misses = []
+    fingerprints = {}
 
-        try:
+    for i, op_match in enumerate(op_matches):
 
-            result = run_inference(
-                op_match=op_match,
-                b365_matches=bet365_matches,
-            )
+        rows = pairs.row(i)[0].tolist()
+        # Fingerprint the aliased names, so a new alias reruns the match
+        fp = fingerprint(rewrite_op(op_match), [pool[r] for r in rows])
 
-            decision = result.get("decision")
-            reason = result.get("reason")
-            candidates = result.get("candidates", [])
+        # An empty window means global retrieval over the whole pool,
+        # which the fingerprint does not cover: never cached
+        cached = cache.get(op_match.get("id"), fp) if rows else None
 
-            if not candidates:
-                continue
+        if cached is not None:
+            decided[i] = (cached["candidates"], cached["decision"])
+        else:
+            misses.append(i)
+            if rows:
+                fingerprints[i] = fp
 
-            best = candidates[0]
+    batch = run_engine_batch_isolated([op_matches[i] for i in misses], pool)
 
-            if decision == "AUTO_MATCH":
+    for i, (candidates, decision) in zip(misses, batch):
+        if decision == "ERROR":
+            continue
+        decided[i] = (candidates, decision)
+        if i in fingerprints:
+            cache.put(op_matches[i].get("id"), fingerprints[i], candidates, decision)
 
-                prob = 1 / (1 + math.exp(-best.get("final_score", 0.0)))
+    results = []
+    exact_hits = 0
 
-                output_row = {
-                    "platform": "ODDSPORTAL",
-                    "bet365_match": best.get("id"),
-                    "provider_id": op_match.get("id"),
-                    "confidence": round(prob, 4),
-                    "is_checked": False,
-                    "is_mapped": True,
-                    "reason": reason,
-                    "switch": best.get("swapped", False),
-                }
+    for i, op_match in enumerate(op_matches):
 
-                results.append(output_row)
+        if i not in decided:
+            continue
 
-        except Exception as e:
-            print(f"Inference error: {e}")
+        candidates, decision = decided[i]
+        if not candidates:
             continue
 
-    print(f"\nAUTO_MATCH approved: {len(results)}")
+        best = candidates[0]
+        exact_hits += best.get("exact_match", False)
+
+        if decision == "AUTO_MATCH":
+
+            prob = 1 / (1 + math.exp(-best.get("final_score", 0.0)))
+
+            output_row = {
+                "platform": "ODDSPORTAL",
+                "bet365_match": best.get("id"),
+                "provider_id": op_match.get("id"),
+                "confidence": round(prob, 4),
+                "is_checked": False,
+                "is_mapped": True,
+                "reason": decision,
+                "switch": best.get("swapped", False),
+                # Exact-key hits skip the models; their confidence is nominal
+                "exact_match": best.get("exact_match", False),
+            }
+
+            results.append(output_row)
+
+    flush_caches()
+    cache.save()
+
+    print(f"\nDecision cache: {cache.hits} reused, {cache.misses} inferred")
+    print(f"Exact-key hits: {exact_hits}/{len(op_matches)} ({100 * exact_hits / max(len(op_matches), 1):.1f}%)")
+    print(f"AUTO_MATCH approved: {len(results)}")
 
     with open(OUT_FILE, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2)
@@ -224,6 +369,84 @@ def main():
     print("✅ Production Cron Output Generated")
     print(f"Saved to: {OUT_FILE}")
 
+    return results
+
+
+# --------------------------------------------------
+# DAEMON MODE
+# --------------------------------------------------
+
+def run_daemon(interval: int):
+    """
+    Keep models, the HTTP session and caches resident and run a cycle
+    every `interval` seconds. Cycles run one after another in this
+    loop; a cycle that overruns delays the next one instead of
+    overlapping it.
+    """
+
+    lock = CycleLock(LOCK_FILE)
+    if not lock.acquire():
+        print("❌ Another production cycle holds the lock. Exiting.")
+        return
+
+    try:
+        print("Warming up models...")
+        registry.warmup()
+        print(f"Models ready in {registry.warmup_seconds}s")
+
+        session = create_session()
+
+        # Indexed Bet365 pool, kept across cycles and synced with each fetch
+        pool = []
+
+        while True:
+
+            started = time.monotonic()
+            print("\n==================================")
+            print(f"Cycle started at {datetime.now(timezone.utc).isoformat()}")
+
+            try:
+                run_cycle(session, pool)
+            except Exception as e:
+                print(f"❌ Cycle failed: {e}")
+
+            elapsed = time.monotonic() - started
+            print(f"Cycle took {elapsed:.1f}s")
+
+            time.sleep(max(0.0, interval - elapsed))
+
+    except KeyboardInterrupt:
+        print("\nDaemon stopped.")
+
+    finally:
+        lock.release()
+
+
+# --------------------------------------------------
+# MAIN CRON EXECUTION
+# --------------------------------------------------
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--daemon", action="store_true", help="stay resident and run cycles on an interval")
+    parser.add_argument("--interval", type=int, default=DAEMON_INTERVAL_SECONDS, help="seconds between cycle starts")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon(args.interval)
+        return
+
+    lock = CycleLock(LOCK_FILE)
+    if not lock.acquire():
+        print("⚠ Previous cycle still running. Skipping this tick.")
+        return
+
+    try:
+        run_cycle(create_session())
+    finally:
+        lock.release()
+
 
 if __name__ == "__main__":
     main()
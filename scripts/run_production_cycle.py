@@ -1,30 +1,37 @@
 import json
 from config import BET365_URL, ODDSPORTAL_URL
-from app.integration.fetcher import fetch_all
-from app.inference.engine import run_engine
+from app.integration.async_fetcher import fetch_feeds
+from app.inference.engine import flush_caches, index_pool, is_exact, run_engine
 from app.inference.output_formatter import format_output
 
 def main():
 
-    print("Fetching Bet365 matches...")
-    bet365 = fetch_all(BET365_URL)
+    print("Fetching Bet365 and OddsPortal matches...")
+    feeds = fetch_feeds({"bet365": BET365_URL, "oddsportal": ODDSPORTAL_URL})
+    bet365 = feeds["bet365"]
+    op_matches = feeds["oddsportal"]
 
-    print("Fetching OddsPortal matches...")
-    op_matches = fetch_all(ODDSPORTAL_URL)
+    print("Encoding Bet365 pool...")
+    index_pool(bet365)
 
     results = []
+    exact_hits = 0
 
     for op in op_matches:
         candidates, decision = run_engine(op, bet365)
+        exact_hits += is_exact(candidates)
 
         if candidates:
             output = format_output(op, candidates[0], decision)
             if output:
                 results.append(output)
 
+    flush_caches()
+
     with open("data/mapping_results.json", "w") as f:
         json.dump(results, f, indent=2)
 
+    print(f"Exact-key hits: {exact_hits}/{len(op_matches)} ({100 * exact_hits / max(len(op_matches), 1):.1f}%)")
     print("Done.")
 
 if __name__ == "__main__":
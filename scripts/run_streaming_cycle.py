@@ -0,0 +1,42 @@
+# scripts/run_streaming_cycle.py
+
+from app.inference.engine import flush_caches, is_exact
+from app.inference.output_formatter import format_output
+from app.integration.storage import JsonlWriter
+from app.integration.streaming import stream_mapping
+
+OUT_FILE = "mapping_results.jsonl"
+
+
+def main():
+
+    print("Streaming Bet365 and OddsPortal matches into inference...")
+
+    processed = 0
+    exact_hits = 0
+
+    # Suggestions are appended and flushed as they are produced
+    with JsonlWriter(OUT_FILE) as writer:
+
+        for op, candidates, decision in stream_mapping():
+
+            processed += 1
+            exact_hits += is_exact(candidates)
+
+            if candidates:
+                output = format_output(op, candidates[0], decision)
+                if output:
+                    writer.write(output)
+
+            if processed % 500 == 0:
+                print(f"Processed {processed} OP matches")
+
+    flush_caches()
+
+    print(f"Processed {processed} OP matches, {writer.count} suggestions")
+    print(f"Exact-key hits: {exact_hits} ({100 * exact_hits / max(processed, 1):.1f}%)")
+    print(f"✅ Saved to: {writer.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from app.inference.assignment import assign_unique
+
+op_matches = [
+    {"id": "op1", "commence_time": 1771180200},
+    {"id": "op2", "commence_time": 1771180200},
+    {"id": "op3", "commence_time": 1771184700},
+]
+
+candidate_lists = [
+    # op1 fits b1 and b2 about equally well
+    [{"id": "b1", "final_score": 2.1}, {"id": "b2", "final_score": 2.0}],
+    # op2 only fits b1: file order would give b1 to op1 and nothing to op2
+    [{"id": "b1", "final_score": 4.0}, {"id": "b3", "final_score": -3.0}],
+    # Separate component
+    [{"id": "b4", "final_score": 1.0}],
+]
+
+for op, chosen in zip(op_matches, assign_unique(op_matches, candidate_lists)):
+    print(op["id"], "->", chosen and chosen["id"])
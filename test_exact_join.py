@@ -0,0 +1,40 @@
+from app.inference.exact_join import ExactIndex
+
+b365_matches = [
+    {
+        "id": "1",
+        "sport": "football",
+        "home_team": "Atlético Madrid",
+        "away_team": "Real Betis",
+        "commence_time": 1771180200,
+    },
+    {
+        "id": "2",
+        "sport": "football",
+        "home_team": "Arsenal FC",
+        "away_team": "Chelsea",
+        "commence_time": 1771184700,
+    },
+    {
+        "id": "3",
+        "sport": "football",
+        "home_team": "Arsenal Women",
+        "away_team": "Chelsea Women",
+        "commence_time": 1771184700,
+    },
+]
+
+op_matches = [
+    # Same fixture, accents and case differ
+    {"sport": "football", "home_team": "atletico madrid", "away_team": "Real Betis", "commence_time": 1771180200},
+    # Home and away swapped, "FC" dropped, kickoff 2 minutes later
+    {"sport": "football", "home_team": "Chelsea", "away_team": "Arsenal", "commence_time": 1771184820},
+    # Kickoff too far apart
+    {"sport": "football", "home_team": "Arsenal", "away_team": "Chelsea", "commence_time": 1771188300},
+]
+
+index = ExactIndex(b365_matches)
+
+for op in op_matches:
+    hit = index.lookup(op)
+    print(op["home_team"], "vs", op["away_team"], "->", hit and (b365_matches[hit[0]]["id"], hit[1]))
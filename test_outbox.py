@@ -0,0 +1,42 @@
+import tempfile
+from pathlib import Path
+
+from app.integration.outbox import FAILED, PENDING, Outbox
+
+path = Path(tempfile.mkdtemp()) / "outbox.db"
+outbox = Outbox(str(path))
+
+row = {"provider_id": "op1", "bet365_match": "b1", "confidence": 0.97}
+print(outbox.enqueue([row]))
+
+# Rejected until PUSH_MAX_ATTEMPTS is used up
+for _ in range(5):
+    (pid, h, _), = outbox.claim(1)
+    outbox.mark_failed(pid, h, "400 Bad Request", max_attempts=5)
+    # Skip the backoff
+    outbox.db.execute("UPDATE outbox SET retry_at = 0")
+
+status = lambda: outbox.db.execute("SELECT attempts, status FROM outbox").fetchone()
+print("after 5 failures:", status())
+assert status() == (5, FAILED)
+
+# Same payload again: stays failed
+print(outbox.enqueue([row]))
+assert status() == (5, FAILED)
+
+# Changed payload: queued afresh
+print(outbox.enqueue([dict(row, bet365_match="b2")]))
+assert status() == (0, PENDING)
+# Sent A, then B queued, then back to A: B must not go out
+outbox = Outbox(str(path.with_name("outbox2.db")))
+sent = {"provider_id": "op2", "bet365_match": "b1", "confidence": 0.9}
+outbox.enqueue([sent])
+(pid, h, _), = outbox.claim(1)
+outbox.mark_sent(pid, h)
+outbox.enqueue([dict(sent, bet365_match="b9")])
+outbox.enqueue([sent])
+row2 = outbox.db.execute("SELECT status, payload FROM outbox WHERE provider_id = 'op2'").fetchone()
+print("A -> B -> A:", row2)
+assert row2[0] == "sent" and '"b1"' in row2[1]
+assert outbox.claim(10) == []
+print("ok")
@@ -0,0 +1,30 @@
+from app.inference.prefilter import PrefilterIndex
+
+op_match = {
+    "sport": "football",
+    "commence_time": 1771180200,
+}
+
+b365_matches = [
+    {
+        "id": "1",
+        "sport": "football",
+        "commence_time": 1771179900,
+    },
+    {
+        "id": "2",
+        "sport": "football",
+        "commence_time": 1771184700,
+    },
+    {
+        "id": "3",
+        "sport": "tennis",
+        "commence_time": 1771180200,
+    },
+]
+
+index = PrefilterIndex(b365_matches)
+rows, diffs = index.query(op_match)
+
+for row, diff in zip(rows, diffs):
+    print(b365_matches[row]["id"], diff)